@@ -0,0 +1,177 @@
+"""
+CPR + Supertrend + RSI Trading Bot - ASGI Application
+Async webhook server, same routes as app.py
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import contextlib
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Route
+from config import Config
+from utils.analytics import render_html
+from utils.logger import setup_logger
+from utils.serialization import dumps
+from utils.webhook_service import build_components, WebhookRejected
+from fyers_auth import AsyncFyersClient
+
+# Setup
+config = Config()
+logger = setup_logger()
+
+# Initialize components
+fyers_client = AsyncFyersClient(config) if not config.PAPER_TRADING else None
+components = build_components(config, fyers_client, logger)
+service = components.service
+analytics = components.analytics
+warmup = components.warmup
+
+STREAM_INTERVAL = 2.0
+
+# ==========================================
+# HELPER FUNCTIONS
+# ==========================================
+
+def json_response(payload, status=200):
+    """JSON response from a dict or already-encoded bytes"""
+    body = payload if isinstance(payload, bytes) else dumps(payload)
+    return Response(body, status_code=status, media_type='application/json')
+
+# ==========================================
+# ROUTES
+# ==========================================
+
+async def home(request):
+    """Health check endpoint"""
+    return json_response(service.health())
+
+async def ready(request):
+    """Readiness probe - 503 until warmup has finished"""
+    return json_response(warmup.status(), 200 if warmup.ready.is_set() else 503)
+
+async def webhook(request):
+    """Main webhook endpoint for TradingView alerts (see app.webhook)"""
+    try:
+        try:
+            trade_details, trade_json = service.prepare(await request.body())
+        except WebhookRejected as e:
+            return json_response(e.payload, e.status)
+
+        # Paper trading mode
+        if config.PAPER_TRADING:
+            return json_response(service.record_paper(trade_details, trade_json))
+
+        # Live trading - Place order via Fyers
+        if fyers_client:
+            order_result = await fyers_client.place_order(
+                symbol=trade_details['symbol'],
+                quantity=trade_details['quantity'],
+                side=1,  # Buy
+                order_type="MARKET"
+            )
+            status, body = service.record_order(trade_details, trade_json, order_result)
+            return json_response(body, status)
+        else:
+            return json_response({
+                "status": "error",
+                "message": "Fyers client not initialized"
+            }, 500)
+
+    except Exception as e:
+        logger.error(f"❌ Webhook error: {str(e)}", exc_info=True)
+        return json_response({"status": "error", "message": str(e)}, 500)
+
+async def get_positions(request):
+    """Get all open positions"""
+    return json_response(service.positions())
+
+async def get_stats(request):
+    """Get today's statistics"""
+    return json_response(service.stats())
+
+async def get_trades(request):
+    """Get trade log"""
+    return json_response(service.trades())
+
+async def get_exposure(request):
+    """Get open exposure by underlying, direction and expiry"""
+    return json_response(service.exposure())
+
+async def get_report(request):
+    """Get performance report over the full trade history"""
+    return json_response(service.report())
+
+async def get_report_html(request):
+    """Performance report as static HTML"""
+    return HTMLResponse(render_html(analytics.build_report()))
+
+async def close_position(request):
+    """Manually close a position"""
+    status, payload = service.close(request.path_params['position_id'])
+    return json_response(payload, status)
+
+async def dashboard(request):
+    """Simple HTML dashboard"""
+    return HTMLResponse(service.dashboard())
+
+async def dashboard_stream(request):
+    """Server-sent events with today's stats and open positions"""
+    async def events():
+        while not await request.is_disconnected():
+            payload = dumps({
+                "stats": service.stats()['stats'],
+                "positions": service.positions()['positions']
+            })
+            yield b'data: ' + payload + b'\n\n'
+            await asyncio.sleep(STREAM_INTERVAL)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache'})
+
+# ==========================================
+# ERROR HANDLERS
+# ==========================================
+
+async def not_found(request, exc):
+    return json_response({"status": "error", "message": "Endpoint not found"}, 404)
+
+async def internal_error(request, exc):
+    logger.error(f"Internal error: {str(exc)}", exc_info=exc)
+    return json_response({"status": "error", "message": "Internal server error"}, 500)
+
+# ==========================================
+# APPLICATION
+# ==========================================
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    logger.info("🚀 CPR Trading Bot Starting (ASGI)...")
+    logger.info(f"📊 Mode: {'PAPER TRADING' if config.PAPER_TRADING else 'LIVE TRADING'}")
+    warmup.run(connect=False)
+    # Broker connect, retries and the daily re-warm run off the event loop
+    warmup.start_background()
+    yield
+
+routes = [
+    Route('/', home),
+    Route('/ready', ready),
+    Route('/webhook', webhook, methods=['POST']),
+    Route('/positions', get_positions, methods=['GET']),
+    Route('/stats', get_stats, methods=['GET']),
+    Route('/trades', get_trades, methods=['GET']),
+    Route('/exposure', get_exposure, methods=['GET']),
+    Route('/report', get_report, methods=['GET']),
+    Route('/report.html', get_report_html, methods=['GET']),
+    Route('/close/{position_id}', close_position, methods=['POST']),
+    Route('/dashboard', dashboard),
+    Route('/dashboard/stream', dashboard_stream),
+]
+
+app = Starlette(
+    routes=routes,
+    exception_handlers={404: not_found, 500: internal_error},
+    lifespan=lifespan
+)
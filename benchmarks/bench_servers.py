@@ -0,0 +1,145 @@
+"""Server benchmark - Flask/gunicorn sync workers vs ASGI/uvicorn
+
+Starts each server in paper trading mode, fires concurrent webhooks at it
+and reports throughput and latency. With --streams, that many dashboard
+streams are held open during the run (ASGI only - a sync worker would be
+pinned by each one).
+
+Usage: python benchmarks/bench_servers.py [--requests 2000] [--concurrency 100] [--streams 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = 'bench_secret'
+
+MODES = {
+    'flask': ['gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+    'asgi': ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', '{port}',
+             '--log-level', 'warning', '--no-access-log'],
+}
+
+BODY = json.dumps({
+    "secret": SECRET,
+    "instrument": "NIFTY",
+    "action": "BUY_CALL",
+    "strike": 0,
+    "entry_price": 21500.50,
+    "atr": 12.30
+}).encode('utf-8')
+
+
+async def http(port, method, path, body=b''):
+    """Minimal HTTP/1.1 request, returns status code"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    await reader.read()
+    writer.close()
+    return status
+
+
+async def hold_stream(port, ready):
+    """Open a dashboard stream and keep reading it"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b"GET /dashboard/stream HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    await reader.readline()
+    ready.release()
+    try:
+        while await reader.read(4096):
+            pass
+    finally:
+        writer.close()
+
+
+async def load(port, requests, concurrency, streams):
+    ready = asyncio.Semaphore(0)
+    stream_tasks = [asyncio.create_task(hold_stream(port, ready)) for _ in range(streams)]
+    for _ in range(streams):
+        await ready.acquire()
+
+    latencies = []
+    statuses = {}
+    queue = iter(range(requests))
+
+    async def worker():
+        for _ in queue:
+            start = time.perf_counter()
+            status = await http(port, 'POST', '/webhook', BODY)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    for task in stream_tasks:
+        task.cancel()
+    await asyncio.gather(*stream_tasks, return_exceptions=True)
+
+    latencies.sort()
+    return {
+        'rps': requests / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'statuses': statuses
+    }
+
+
+def wait_until_up(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if asyncio.run(http(port, 'GET', '/')) == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def run_mode(mode, port, args, workdir):
+    env = dict(os.environ,
+               PAPER_TRADING='True', WEBHOOK_SECRET=SECRET,
+               MAX_TRADES_PER_DAY='100000000', MAX_DAILY_LOSS='100',
+               MAX_PORTFOLIO_RISK='1e12', MAX_UNDERLYING_RISK='1e12',
+               MAX_POSITIONS_PER_UNDERLYING='100000000', MAX_SAME_DIRECTION='100000000',
+               PORT=str(port),
+               ANALYTICS_LOG=os.path.join(workdir, f'{mode}_events.jsonl'))
+    cmd = [part.format(port=port) for part in MODES[mode]]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port)
+        streams = args.streams if mode == 'asgi' else 0
+        return asyncio.run(load(port, args.requests, args.concurrency, streams))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--streams', type=int, default=0)
+    parser.add_argument('--modes', default='flask,asgi')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for offset, mode in enumerate(args.modes.split(',')):
+            result = run_mode(mode, 18000 + offset, args, workdir)
+            print(f"{mode:>6}: {result['rps']:8.1f} req/s | p50 {result['p50_ms']:6.1f} ms | "
+                  f"p99 {result['p99_ms']:6.1f} ms | {result['statuses']}")
+            # Rejected webhooks skip the order path, their timings mean nothing
+            if result['statuses'].get(200, 0) * 2 < args.requests:
+                raise SystemExit(f"{mode}: most webhooks were not accepted {result['statuses']}")
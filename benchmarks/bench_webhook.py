@@ -0,0 +1,83 @@
+"""Webhook micro-benchmark - legacy parse/encode path vs signal decoder
+
+Usage: python benchmarks/bench_webhook.py [iterations]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.serialization import BACKEND, dumps, dumps_with
+from utils.signal_decoder import decode_signal
+
+SECRET = 'bench_secret'
+BODY = json.dumps({
+    "secret": SECRET,
+    "instrument": "NIFTY",
+    "action": "BUY_CALL",
+    "strike": 0,
+    "entry_price": 21500.50,
+    "atr": 120.30
+}).encode('utf-8')
+
+
+def trade_from(instrument, action, entry_price, atr, strike):
+    return {
+        "position_id": f"CPR_{instrument}_{strike}CE_091500",
+        "strategy": "CPR",
+        "instrument": instrument,
+        "symbol": "NSE:NIFTY24OCT2421500CE",
+        "action": action,
+        "option_type": "CE",
+        "strike": strike,
+        "strike_selection": "ATM",
+        "entry_price": entry_price,
+        "quantity": 50,
+        "stop_loss": round(entry_price - atr * 1.5, 2),
+        "take_profit": round(entry_price + atr * 3.0, 2),
+        "atr": atr,
+        "expiry": "241024",
+        "risk": round(atr * 1.5 * 50, 2)
+    }
+
+
+def legacy():
+    """Mirror of the previous /webhook body handling"""
+    data = json.loads(BODY)
+    json.dumps(data, indent=2)
+    if data.get('secret') != SECRET:
+        return None
+    instrument = data.get('instrument', '').upper()
+    action = data.get('action', '').upper()
+    entry_price = float(data.get('entry_price', 0))
+    atr = float(data.get('atr', 0))
+    strike = float(data.get('strike', 0))
+    if not all([instrument, action, entry_price, atr]):
+        return None
+    trade = trade_from(instrument, action, entry_price, atr, 21500)
+    json.dumps(trade, indent=2)
+    return json.dumps({"status": "success", "mode": "paper_trading", "trade": trade}).encode('utf-8')
+
+
+def decoder():
+    """Current /webhook body handling"""
+    signal = decode_signal(BODY, SECRET)
+    trade = trade_from(signal.instrument, signal.action, signal.entry_price, signal.atr, 21500)
+    trade_json = dumps(trade)
+    trade_json.decode('utf-8')
+    return dumps_with({"status": "success", "mode": "paper_trading"}, trade=trade_json)
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    assert json.loads(legacy()) == json.loads(decoder())
+
+    print(f"JSON backend: {BACKEND} | iterations: {n:,}")
+    results = {}
+    for name, fn in (('legacy', legacy), ('decoder', decoder)):
+        best = min(timeit.repeat(fn, number=n, repeat=5))
+        results[name] = best / n * 1e6
+        print(f"{name:>8}: {results[name]:7.2f} µs/request")
+    print(f" speedup: {results['legacy'] / results['decoder']:.2f}x")
@@ -1,7 +1,7 @@
 """Configuration Management"""
 import os
 import pytz
-from dotenv import load_dotenv
+from dotenv import load_dotenv, dotenv_values
 
 load_dotenv()
 
@@ -12,12 +12,19 @@ class Config:
     
     FYERS_APP_ID = os.getenv('FYERS_APP_ID', '')
     FYERS_ACCESS_TOKEN = os.getenv('FYERS_ACCESS_TOKEN', '')
+    FYERS_TOKEN_FILE = os.getenv('FYERS_TOKEN_FILE', 'token.txt')
     
     CAPITAL = float(os.getenv('CAPITAL', '100000'))
     MAX_RISK_PER_TRADE = float(os.getenv('MAX_RISK_PER_TRADE', '2.0'))
     MAX_DAILY_LOSS = float(os.getenv('MAX_DAILY_LOSS', '5.0'))
     MAX_TRADES_PER_DAY = int(os.getenv('MAX_TRADES_PER_DAY', '4'))
     
+    MAX_PORTFOLIO_RISK = float(os.getenv('MAX_PORTFOLIO_RISK', '6.0'))
+    MAX_UNDERLYING_RISK = float(os.getenv('MAX_UNDERLYING_RISK', '4.0'))
+    MAX_POSITIONS_PER_UNDERLYING = int(os.getenv('MAX_POSITIONS_PER_UNDERLYING', '2'))
+    MAX_SAME_DIRECTION = int(os.getenv('MAX_SAME_DIRECTION', '1'))
+    MARGIN_CACHE_TTL = float(os.getenv('MARGIN_CACHE_TTL', '30'))
+    
     SL_MULTIPLIER = float(os.getenv('SL_MULTIPLIER', '1.5'))
     TP_MULTIPLIER = float(os.getenv('TP_MULTIPLIER', '3.0'))
     
@@ -32,10 +39,29 @@ class Config:
     
     STRIKE_SELECTION = os.getenv('STRIKE_SELECTION', 'ATM')
     
+    SQUARE_OFF_TIME = os.getenv('SQUARE_OFF_TIME', '15:15')
+    MARK_INTERVAL = float(os.getenv('MARK_INTERVAL', '15'))
+    
     PAPER_TRADING = os.getenv('PAPER_TRADING', 'True').lower() == 'true'
     
+    ANALYTICS_LOG = os.getenv('ANALYTICS_LOG', 'logs/trade_events.jsonl')
+    
+    WARMUP_TIME = os.getenv('WARMUP_TIME', '09:00')
+    WARMUP_STRIKES = int(os.getenv('WARMUP_STRIKES', '10'))
+    
     IST = pytz.timezone('Asia/Kolkata')
     
+    @classmethod
+    def reload_access_token(cls):
+        """Re-read the daily token: token file (generate_token.py), then .env, then environment"""
+        token = dotenv_values().get('FYERS_ACCESS_TOKEN') or os.getenv('FYERS_ACCESS_TOKEN', '')
+        if os.path.exists(cls.FYERS_TOKEN_FILE):
+            with open(cls.FYERS_TOKEN_FILE) as f:
+                token = f.read().strip() or token
+        if token:
+            cls.FYERS_ACCESS_TOKEN = token
+        return cls.FYERS_ACCESS_TOKEN
+    
     @classmethod
     def validate(cls):
         """Validate configuration"""
@@ -3,16 +3,57 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def order_payload(symbol, quantity, side, order_type="MARKET"):
+    """Build Fyers order request"""
+    return {
+        "symbol": symbol,
+        "qty": quantity,
+        "type": 2 if order_type == "MARKET" else 1,
+        "side": side,
+        "productType": "INTRADAY",
+        "limitPrice": 0,
+        "stopPrice": 0,
+        "validity": "DAY",
+        "disclosedQty": 0,
+        "offlineOrder": False
+    }
+
+def parse_funds_response(response):
+    """Available balance from Fyers funds response"""
+    if response['s'] != 'ok':
+        logger.error(f"❌ Funds failed: {response.get('message')}")
+        return None
+    for item in response.get('fund_limit', []):
+        if item.get('title') == 'Available Balance':
+            return float(item['equityAmount'])
+    return None
+
+def parse_positions_response(response):
+    """Net positions from Fyers positions response, None on failure"""
+    if response['s'] != 'ok':
+        logger.error(f"❌ Positions failed: {response.get('message')}")
+        return None
+    return response.get('netPositions', [])
+
+def parse_order_response(response):
+    """Normalize Fyers order response"""
+    if response['s'] == 'ok':
+        logger.info(f"✅ Order: {response['id']}")
+        return {"success": True, "order_id": response['id']}
+    logger.error(f"❌ Order failed: {response.get('message')}")
+    return {"success": False, "error": response.get('message')}
+
 class FyersClient:
     """Fyers API wrapper"""
     
-    def __init__(self, config):
+    def __init__(self, config, connect=True):
         self.config = config
         self.fyers = None
-        self._initialize()
+        if connect:
+            self.connect()
     
-    def _initialize(self):
-        """Initialize Fyers"""
+    def connect(self):
+        """Initialize Fyers and verify the token"""
         try:
             from fyers_apiv3 import fyersModel
             
@@ -36,38 +77,109 @@ class FyersClient:
     def place_order(self, symbol, quantity, side, order_type="MARKET"):
         """Place order"""
         try:
-            data = {
-                "symbol": symbol,
-                "qty": quantity,
-                "type": 2 if order_type == "MARKET" else 1,
-                "side": side,
-                "productType": "INTRADAY",
-                "limitPrice": 0,
-                "stopPrice": 0,
-                "validity": "DAY",
-                "disclosedQty": 0,
-                "offlineOrder": False
-            }
+            if self.fyers is None:
+                self.connect()
+            response = self.fyers.place_order(order_payload(symbol, quantity, side, order_type))
+            return parse_order_response(response)
+        except Exception as e:
+            logger.error(f"❌ Exception: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def get_funds(self):
+        """Get available margin"""
+        try:
+            return parse_funds_response(self.fyers.funds())
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            return None
+    
+    def get_quotes(self, symbols):
+        """Get last traded prices, {symbol: ltp}"""
+        try:
+            response = self.fyers.quotes({"symbols": ",".join(symbols)})
+            if response['s'] == 'ok':
+                return {q['n']: q['v']['lp'] for q in response['d'] if q.get('s') == 'ok'}
+            return {}
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            return {}
+    
+    def get_positions(self):
+        """Get net positions (None if the request failed)"""
+        try:
+            return parse_positions_response(self.fyers.positions())
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            return None
+
+class AsyncFyersClient:
+    """Fyers API wrapper for asyncio servers
+    
+    Uses the SDK's async mode, so a pending broker call only suspends
+    its own request instead of blocking a worker process.
+    """
+    
+    def __init__(self, config):
+        self.config = config
+        self.fyers = None
+    
+    async def connect(self):
+        """Initialize Fyers and verify the token"""
+        try:
+            from fyers_apiv3 import fyersModel
             
-            response = self.fyers.place_order(data)
+            self.fyers = fyersModel.FyersModel(
+                client_id=self.config.FYERS_APP_ID,
+                token=self.config.FYERS_ACCESS_TOKEN,
+                is_async=True,
+                log_path=""
+            )
             
-            if response['s'] == 'ok':
-                logger.info(f"✅ Order: {response['id']}")
-                return {"success": True, "order_id": response['id']}
+            profile = await self.fyers.get_profile()
+            if profile['s'] == 'ok':
+                logger.info(f"✅ Fyers (async): {profile['data']['name']}")
+                return True
             else:
-                logger.error(f"❌ Order failed: {response.get('message')}")
-                return {"success": False, "error": response.get('message')}
+                logger.error(f"❌ Fyers failed: {profile.get('message')}")
+                return False
+        except Exception as e:
+            logger.error(f"❌ Fyers error: {e}")
+            return False
+    
+    async def place_order(self, symbol, quantity, side, order_type="MARKET"):
+        """Place order"""
+        try:
+            if self.fyers is None:
+                await self.connect()
+            response = await self.fyers.place_order(order_payload(symbol, quantity, side, order_type))
+            return parse_order_response(response)
         except Exception as e:
             logger.error(f"❌ Exception: {e}")
             return {"success": False, "error": str(e)}
     
-    def get_positions(self):
-        """Get positions"""
+    async def get_funds(self):
+        """Get available margin"""
+        try:
+            return parse_funds_response(await self.fyers.funds())
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            return None
+    
+    async def get_quotes(self, symbols):
+        """Get last traded prices, {symbol: ltp}"""
         try:
-            response = self.fyers.positions()
+            response = await self.fyers.quotes({"symbols": ",".join(symbols)})
             if response['s'] == 'ok':
-                return response['netPositions']
-            return []
+                return {q['n']: q['v']['lp'] for q in response['d'] if q.get('s') == 'ok'}
+            return {}
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            return {}
+    
+    async def get_positions(self):
+        """Get net positions (None if the request failed)"""
+        try:
+            return parse_positions_response(await self.fyers.positions())
         except Exception as e:
             logger.error(f"Error: {e}")
-            return []
\ No newline at end of file
+            return None
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""Performance Report Generator - Run after market close"""
+import sys
+from config import Config
+from utils.analytics import TradeAnalytics
+
+event_log = sys.argv[1] if len(sys.argv) > 1 else Config.ANALYTICS_LOG
+
+print("=" * 60)
+print("CPR TRADING BOT - PERFORMANCE REPORT")
+print("=" * 60)
+
+analytics = TradeAnalytics(Config.CAPITAL, event_log=event_log)
+analytics.event_log = None  # read-only: never append while reporting
+
+analytics.export_json('report.json')
+report = analytics.export_html('report.html')
+summary = report['summary']
+profit_factor = summary['profit_factor'] if summary['profit_factor'] is not None else '∞'
+
+print(f"\nEvents replayed: {report['events']}")
+print(f"Trading days:    {summary['trading_days']}")
+print(f"Total P&L:       ₹{summary['total_pnl']:,.2f} ({summary['return_pct']}%)")
+print(f"Win Rate:        {summary['win_rate']}%")
+print(f"Profit Factor:   {profit_factor}")
+print(f"Expectancy:      ₹{summary['expectancy']:,.2f}")
+print(f"Max Drawdown:    {summary['max_drawdown_pct']}%")
+print("\n✅ Saved report.json and report.html")
+print("=" * 60)
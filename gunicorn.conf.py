@@ -0,0 +1,30 @@
+"""Gunicorn configuration - preload and warm in the master, fork the worker
+
+The app is imported once in the master (preload_app). when_ready runs
+the CPU-only warmup there and freezes the heap so a restarted worker
+inherits the warmed tables copy-on-write. The worker opens its own broker
+session after the fork; sockets must never be shared between processes.
+
+Open positions and portfolio limits live in worker memory, so there is
+always a single worker, in paper and live trading alike: with several,
+each would check orders against only its own share of the exposure.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = 1
+timeout = 120
+preload_app = True
+
+
+def when_ready(server):
+    import app
+    app.warmup.run(connect=False)
+    # Keep refcount/GC writes from dirtying the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+    app.warmup.start_background()
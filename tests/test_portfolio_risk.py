@@ -0,0 +1,178 @@
+"""Tests for portfolio-level exposure limits and the margin cache"""
+from datetime import datetime
+import pytest
+from utils import clock
+from utils.portfolio_risk import PortfolioRisk, MarginCache, IST, RECONCILE_GRACE
+
+
+class Config:
+    CAPITAL = 100000.0
+    MAX_PORTFOLIO_RISK = 6.0
+    MAX_UNDERLYING_RISK = 4.0
+    MAX_POSITIONS_PER_UNDERLYING = 2
+    MAX_SAME_DIRECTION = 1
+
+
+class Timer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def day():
+    """Pin the clock to a trading day, returns a setter for later days"""
+    def set_day(d):
+        clock.set_clock(lambda tz=None: IST.localize(datetime(2024, 11, d, 10, 0)))
+    set_day(7)
+    yield set_day
+    clock.reset_clock()
+
+
+def trade(position_id, instrument='NIFTY', option_type='CE', risk=750.0, symbol=None):
+    return {
+        'position_id': position_id,
+        'instrument': instrument,
+        'option_type': option_type,
+        'symbol': symbol or f"NSE:{instrument}24N1421500{option_type}",
+        'expiry': '241114',
+        'strike': 21500,
+        'entry_price': 21500.0,
+        'quantity': 50,
+        'risk': risk
+    }
+
+
+def margin_cache(funds, timer, positions=None):
+    cache = MarginCache(lambda: funds, ttl=30, timer=timer, positions=positions)
+    cache.refresh()
+    return cache
+
+
+def test_check_reserves_until_released(day):
+    risk = PortfolioRisk(Config())
+
+    assert risk.check(trade('A')) == (True, "OK")
+    # Reserved before the order resolves: the same side is now full
+    allowed, message = risk.check(trade('B'))
+    assert not allowed and "NIFTY CE position limit" in message
+    assert risk.snapshot()['open_positions'] == 1
+
+    risk.release('A')
+    assert risk.check(trade('B')) == (True, "OK")
+
+
+def test_underlying_and_portfolio_limits(day):
+    risk = PortfolioRisk(Config())
+
+    assert risk.check(trade('A', option_type='CE'))[0]
+    assert risk.check(trade('B', option_type='PE'))[0]
+    allowed, message = risk.check(trade('C', instrument='NIFTY', option_type='CE'))
+    assert not allowed and "NIFTY position limit" in message
+
+    allowed, message = risk.check(trade('D', instrument='BANKNIFTY', risk=4500.0))
+    assert not allowed and "BANKNIFTY risk limit" in message
+    assert risk.check(trade('E', instrument='BANKNIFTY', risk=3900.0))[0]
+    # 1500 + 3900 open, 6% of capital is 6000
+    allowed, message = risk.check(trade('F', instrument='FINNIFTY', risk=1000.0))
+    assert not allowed and "Portfolio risk limit" in message
+
+
+def test_close_releases_exposure(day):
+    risk = PortfolioRisk(Config())
+    position = trade('A')
+    risk.check(position)
+    risk.on_position_opened(position)  # already reserved, counted once
+    assert risk.snapshot()['open_positions'] == 1
+
+    risk.on_position_closed(position)
+    snapshot = risk.snapshot()
+    assert snapshot['open_positions'] == 0 and snapshot['open_risk'] == 0
+
+
+def test_duplicate_position_id_rejected(day):
+    config = Config()
+    config.MAX_SAME_DIRECTION = 2
+    risk = PortfolioRisk(config)
+
+    assert risk.check(trade('A'))[0]
+    allowed, message = risk.check(trade('A'))
+    assert not allowed and "Duplicate" in message
+
+    risk.release('A')
+    assert risk.snapshot()['open_positions'] == 0
+
+
+def test_day_rollover_resets_exposure(day):
+    risk = PortfolioRisk(Config())
+    risk.check(trade('A', option_type='CE'))
+    risk.check(trade('B', option_type='PE'))
+    assert not risk.check(trade('C'))[0]
+
+    day(8)
+    assert risk.check(trade('C')) == (True, "OK")
+    assert risk.snapshot()['open_positions'] == 1
+
+
+def test_margin_reserved_and_returned_on_release(day):
+    timer = Timer()
+    # Estimated premium: 21500 * 0.4% = 86 per unit, 4300 per lot of 50
+    risk = PortfolioRisk(Config(), margin_cache(5000.0, timer))
+
+    assert risk.check(trade('A', option_type='CE'))[0]
+    allowed, message = risk.check(trade('B', option_type='PE'))
+    assert not allowed and "Insufficient margin" in message
+
+    risk.release('A')  # order failed
+    assert risk.check(trade('B', option_type='PE'))[0]
+
+
+def test_broker_square_off_reconciled(day):
+    timer = Timer()
+    book = []
+    cache = margin_cache(1e6, timer, positions=lambda: book)
+    risk = PortfolioRisk(Config(), cache)
+
+    risk.check(trade('A', symbol='NSE:A'))
+    book.append({'symbol': 'NSE:A', 'netQty': 50})
+    timer.now += RECONCILE_GRACE + 1
+    risk.check(trade('B', option_type='PE', symbol='NSE:B'))  # still in flight
+    cache.refresh()
+    assert risk.snapshot()['open_positions'] == 2
+
+    # Broker squared both off; only the one past the grace period is dropped
+    book[0]['netQty'] = 0
+    book.append({'symbol': 'NSE:B', 'netQty': 0})
+    cache.refresh()
+    assert set(risk.tracked) == {'B'}
+
+    timer.now += RECONCILE_GRACE + 1
+    cache.refresh()
+    assert risk.snapshot()['open_positions'] == 0
+
+
+def test_unmatched_symbol_is_kept(day):
+    timer = Timer()
+    # Broker spells the symbol differently, or does not list it at all
+    book = [{'symbol': 'NSE:NIFTY24N1421500CE', 'netQty': 0}]
+    cache = margin_cache(1e6, timer, positions=lambda: book)
+    risk = PortfolioRisk(Config(), cache)
+    risk.check(trade('A', symbol='NSE:NIFTY14NOV2421500CE'))
+    risk.check(trade('B', option_type='PE', symbol='NSE:NIFTY14NOV2421500PE'))
+
+    timer.now += RECONCILE_GRACE + 1
+    cache.refresh()
+    assert set(risk.tracked) == {'A', 'B'}
+
+
+def test_failed_positions_fetch_keeps_exposure(day):
+    timer = Timer()
+    cache = margin_cache(1e6, timer, positions=lambda: None)
+    risk = PortfolioRisk(Config(), cache)
+    risk.check(trade('A'))
+
+    timer.now += RECONCILE_GRACE + 1
+    cache.refresh()
+    assert risk.snapshot()['open_positions'] == 1
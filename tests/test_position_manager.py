@@ -0,0 +1,42 @@
+"""Tests for position listeners and excursion tracking"""
+from utils.position_manager import PositionManager
+
+
+class Recorder:
+    def __init__(self):
+        self.closed = []
+
+    def on_position_closed(self, position):
+        self.closed.append(position['position_id'])
+
+
+class Broken:
+    def on_position_closed(self, position):
+        raise OSError("log unwritable")
+
+
+def position(position_id, option_type='CE'):
+    return {'position_id': position_id, 'symbol': 'S', 'instrument': 'NIFTY',
+            'option_type': option_type, 'entry_price': 100.0, 'quantity': 10}
+
+
+def test_failing_listener_does_not_stop_the_others():
+    recorder = Recorder()
+    manager = PositionManager(listeners=[Broken(), recorder])
+    manager.add_position('A', position('A'))
+
+    assert manager.close_position('A', 110.0) == 100.0
+    assert recorder.closed == ['A']
+
+
+def test_excursions_only_from_marks():
+    manager = PositionManager()
+    manager.add_position('A', position('A'))
+    manager.close_position('A', 110.0)
+    assert 'mae' not in manager.get_position('A')
+
+    manager.add_position('B', position('B', 'PE'))
+    manager.mark_price('B', 104.0)
+    manager.mark_price('B', 97.0)
+    manager.close_position('B', 99.0)
+    assert (manager.get_position('B')['mae'], manager.get_position('B')['mfe']) == (-40.0, 30.0)
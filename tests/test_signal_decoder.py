@@ -0,0 +1,81 @@
+"""Tests for webhook signal decoding and validation"""
+import json
+import pytest
+from utils.signal_decoder import decode_signal, SignalError, UnauthorizedSignal
+
+SECRET = 'test_secret'
+
+VALID = {
+    "secret": SECRET,
+    "instrument": "nifty",
+    "action": "buy_put",
+    "entry_price": 21500.5,
+    "atr": 120
+}
+
+
+def body(**fields):
+    return json.dumps({**VALID, **fields}).encode('utf-8')
+
+
+def rejected(raw, message):
+    with pytest.raises(SignalError) as e:
+        decode_signal(raw, SECRET)
+    assert str(e.value) == message
+    return e.value
+
+
+def test_valid_signal():
+    signal = decode_signal(body(strike=21500), SECRET)
+    assert (signal.instrument, signal.action, signal.option_type) == ('NIFTY', 'BUY_PUT', 'PE')
+    assert (signal.entry_price, signal.atr, signal.strike) == (21500.5, 120.0, 21500.0)
+    assert decode_signal(body(), SECRET).strike == 0
+
+
+def test_wrong_secret():
+    error = rejected(body(secret='nope'), "Unauthorized")
+    assert isinstance(error, UnauthorizedSignal) and error.status == 401
+    rejected(body(secret=None), "Unauthorized")
+
+
+@pytest.mark.parametrize('raw', [b'not json', b'[1, 2]', b'"text"', b'null'])
+def test_not_a_json_object(raw):
+    assert rejected(raw, "Invalid JSON").status == 400
+
+
+@pytest.mark.parametrize('field', ['instrument', 'action', 'entry_price', 'atr'])
+def test_missing_field(field):
+    data = {**VALID}
+    del data[field]
+    rejected(json.dumps(data).encode('utf-8'), "Missing required fields")
+    rejected(body(**{field: None}), "Missing required fields")
+
+
+@pytest.mark.parametrize('field', ['entry_price', 'atr', 'strike'])
+@pytest.mark.parametrize('value', ["nan", "inf", float('nan'), float('inf'), float('-inf')])
+def test_non_finite_numbers(field, value):
+    # Bare NaN/Infinity literals are invalid JSON to orjson/msgspec, stdlib json decodes them
+    with pytest.raises(SignalError) as e:
+        decode_signal(body(**{field: value}), SECRET)
+    assert e.value.status == 400
+    assert str(e.value) in (f"Invalid {field}", "Invalid JSON")
+
+
+@pytest.mark.parametrize('field, value', [
+    ('entry_price', -21500), ('entry_price', 0), ('atr', -500), ('atr', 0), ('strike', -50)
+])
+def test_out_of_range_numbers(field, value):
+    rejected(body(**{field: value}), f"Invalid {field}")
+
+
+@pytest.mark.parametrize('field, value', [
+    ('entry_price', True), ('atr', False), ('strike', True),
+    ('entry_price', "21500"), ('atr', [1]), ('strike', {}),
+    ('instrument', ["NIFTY"]), ('instrument', {}), ('action', 1), ('action', True)
+])
+def test_wrong_types(field, value):
+    rejected(body(**{field: value}), f"Invalid {field}")
+
+
+def test_unknown_action():
+    rejected(body(action="SELL_CALL"), "Invalid action")
@@ -0,0 +1,390 @@
+"""Trade Analytics - Event-sourced performance aggregates and reports"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from html import escape
+import pytz
+from . import clock
+
+IST = pytz.timezone('Asia/Kolkata')
+
+logger = logging.getLogger('CPR_BOT')
+
+PERIODS = ('daily', 'weekly', 'monthly')
+BREAKDOWNS = ('instrument', 'strike')
+
+
+class Aggregate:
+    """Running totals for one bucket of closed trades"""
+
+    __slots__ = (
+        'trades', 'winners', 'losers', 'pnl', 'gross_profit', 'gross_loss',
+        'largest_win', 'largest_loss', 'sum_mae', 'sum_mfe', 'worst_mae',
+        'best_mfe', 'marked', 'peak', 'max_drawdown', 'max_consecutive_losses',
+        '_losing_streak'
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0.0)
+        self.trades = self.winners = self.losers = self.marked = 0
+        self.max_consecutive_losses = self._losing_streak = 0
+
+    def add(self, pnl, mae=None, mfe=None):
+        """Fold one closed trade into the bucket
+
+        mae/mfe are None for trades whose price was never marked while
+        open; those count towards P&L but not the excursion averages.
+        """
+        self.trades += 1
+        self.pnl += pnl
+
+        if pnl > 0:
+            self.winners += 1
+            self.gross_profit += pnl
+            self.largest_win = max(self.largest_win, pnl)
+            self._losing_streak = 0
+        else:
+            self.losers += 1
+            self.gross_loss += abs(pnl)
+            self.largest_loss = min(self.largest_loss, pnl)
+            self._losing_streak += 1
+            self.max_consecutive_losses = max(self.max_consecutive_losses, self._losing_streak)
+
+        if mae is not None and mfe is not None:
+            self.marked += 1
+            self.sum_mae += mae
+            self.sum_mfe += mfe
+            self.worst_mae = min(self.worst_mae, mae)
+            self.best_mfe = max(self.best_mfe, mfe)
+
+        # Drawdown of this bucket's own equity curve, starting at zero
+        self.peak = max(self.peak, self.pnl)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.pnl)
+
+    def to_dict(self):
+        """Derived metrics for reporting"""
+        trades = self.trades or 1
+        marked = self.marked
+        avg_win = self.gross_profit / self.winners if self.winners else 0.0
+        avg_loss = self.gross_loss / self.losers if self.losers else 0.0
+
+        if self.gross_loss > 0:
+            profit_factor = round(self.gross_profit / self.gross_loss, 2)
+        else:
+            profit_factor = None if self.gross_profit > 0 else 0.0
+
+        return {
+            'trades': self.trades,
+            'winners': self.winners,
+            'losers': self.losers,
+            'win_rate': round(self.winners / trades * 100, 2),
+            'total_pnl': round(self.pnl, 2),
+            'gross_profit': round(self.gross_profit, 2),
+            'gross_loss': round(self.gross_loss, 2),
+            'profit_factor': profit_factor,
+            'expectancy': round(self.pnl / trades, 2),
+            'avg_win': round(avg_win, 2),
+            'avg_loss': round(avg_loss, 2),
+            'largest_win': round(self.largest_win, 2),
+            'largest_loss': round(self.largest_loss, 2),
+            'max_drawdown': round(self.max_drawdown, 2),
+            'max_consecutive_losses': self.max_consecutive_losses,
+            'avg_mae': round(self.sum_mae / marked, 2) if marked else None,
+            'avg_mfe': round(self.sum_mfe / marked, 2) if marked else None,
+            'worst_mae': round(self.worst_mae, 2) if marked else None,
+            'best_mfe': round(self.best_mfe, 2) if marked else None
+        }
+
+
+class TradeAnalytics:
+    """Append-only trade event log with incremental roll-ups
+
+    Every closed position becomes one event. Events are appended to a
+    JSONL file and folded into daily/weekly/monthly/instrument/strike
+    aggregates as they arrive, so building a report only walks the
+    buckets, never the raw trade history.
+
+    With an event log, aggregates are fed from the file rather than from
+    record() directly: every read folds in the lines appended since the
+    last one, so each worker process also sees the other workers' trades.
+    """
+
+    def __init__(self, capital, event_log=None):
+        self.capital = capital
+        self.event_log = event_log
+        self.total = Aggregate()
+        self.buckets = {name: {} for name in PERIODS + BREAKDOWNS}
+        self.event_count = 0
+        self._offset = 0  # bytes of event_log already folded in
+        self._lock = threading.Lock()
+
+        self.sync()
+
+    # ------------------------------------------
+    # Event ingestion
+    # ------------------------------------------
+
+    def on_position_closed(self, position):
+        """PositionManager listener - record a closed position"""
+        self.record(self.event_from_position(position))
+
+    @staticmethod
+    def event_from_position(position):
+        """Flatten a closed position into a trade event"""
+        return {
+            'position_id': position['position_id'],
+            'instrument': position.get('instrument', ''),
+            'symbol': position.get('symbol', ''),
+            'option_type': position.get('option_type', ''),
+            'strike_selection': position.get('strike_selection', 'MANUAL'),
+            'strike_offset': position.get('strike_offset'),
+            'entry_time': position.get('entry_time'),
+            'exit_time': position.get('exit_time') or clock.now(IST).isoformat(),
+            'entry_price': position['entry_price'],
+            'exit_price': position['exit_price'],
+            'quantity': position['quantity'],
+            'pnl': position['pnl'],
+            'mae': position.get('mae'),
+            'mfe': position.get('mfe')
+        }
+
+    def record(self, event):
+        """Persist an event and fold it into the aggregates"""
+        if not self.event_log:
+            self.apply(event)
+            return
+        log_dir = os.path.dirname(self.event_log)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        try:
+            # One append per event, so concurrent writers never interleave lines
+            with open(self.event_log, 'a') as f:
+                f.write(json.dumps(event) + '\n')
+        except OSError as e:
+            # Keep the trade in this process' report even if the log is unwritable
+            logger.error(f"❌ Analytics log write failed: {e}")
+            with self._lock:
+                self.apply(event)
+            return
+        self.sync()
+
+    def sync(self):
+        """Fold in events appended to the log since the last read"""
+        if not self.event_log or not os.path.exists(self.event_log):
+            return
+        with self._lock:
+            try:
+                with open(self.event_log, 'rb') as f:
+                    f.seek(self._offset)
+                    chunk = f.read()
+            except OSError as e:
+                logger.error(f"❌ Analytics log read failed: {e}")
+                return
+            # A line still being written is picked up next time
+            end = chunk.rfind(b'\n') + 1
+            for line in chunk[:end].splitlines():
+                if line.strip():
+                    self.apply(json.loads(line))
+            self._offset += end
+
+    def apply(self, event):
+        """Fold one event into every bucket it belongs to"""
+        closed = datetime.fromisoformat(event['exit_time'])
+        year, week, _ = closed.isocalendar()
+        keys = {
+            'daily': closed.date().isoformat(),
+            'weekly': f"{year}-W{week:02d}",
+            'monthly': closed.strftime('%Y-%m'),
+            'instrument': event.get('instrument') or 'UNKNOWN',
+            'strike': strike_bucket(event)
+        }
+
+        pnl = event['pnl']
+        mae = event.get('mae')
+        mfe = event.get('mfe')
+
+        self.total.add(pnl, mae, mfe)
+        for name, key in keys.items():
+            bucket = self.buckets[name].get(key)
+            if bucket is None:
+                bucket = self.buckets[name][key] = Aggregate()
+            bucket.add(pnl, mae, mfe)
+        self.event_count += 1
+
+    # ------------------------------------------
+    # Reporting
+    # ------------------------------------------
+
+    def equity_curve(self):
+        """End-of-day equity, one point per trading day"""
+        curve = []
+        equity = self.capital
+        peak = equity
+        for day in sorted(self.buckets['daily']):
+            equity += self.buckets['daily'][day].pnl
+            peak = max(peak, equity)
+            curve.append({
+                'date': day,
+                'pnl': round(self.buckets['daily'][day].pnl, 2),
+                'equity': round(equity, 2),
+                'drawdown_pct': round((peak - equity) / peak * 100, 2) if peak else 0.0
+            })
+        return curve
+
+    def build_report(self):
+        """Full performance report as a plain dict"""
+        self.sync()
+        curve = self.equity_curve()
+        summary = self.total.to_dict()
+        summary['capital'] = self.capital
+        summary['return_pct'] = round(self.total.pnl / self.capital * 100, 2) if self.capital else 0.0
+        summary['max_drawdown_pct'] = max((p['drawdown_pct'] for p in curve), default=0.0)
+        summary['trading_days'] = len(curve)
+
+        report = {
+            'generated_at': clock.now(IST).isoformat(),
+            'events': self.event_count,
+            'summary': summary,
+            'equity_curve': curve
+        }
+        for name in PERIODS + BREAKDOWNS:
+            buckets = self.buckets[name]
+            report[name] = {key: buckets[key].to_dict() for key in sorted(buckets)}
+        return report
+
+    def export_json(self, path):
+        """Write report as JSON"""
+        report = self.build_report()
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def export_html(self, path):
+        """Write report as a static HTML page"""
+        report = self.build_report()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(render_html(report))
+        return report
+
+
+def strike_bucket(event):
+    """ATM / ITMn / OTMn from the strike's distance to ATM in strike intervals"""
+    offset = event.get('strike_offset')
+    if offset is None:
+        # Events logged before offsets were recorded
+        return event.get('strike_selection') or 'MANUAL'
+    if offset == 0:
+        return 'ATM'
+    # A strike above ATM is out of the money for a call, in the money for a put
+    otm = (offset > 0) == (event.get('option_type') != 'PE')
+    return f"{'OTM' if otm else 'ITM'}{abs(offset)}"
+
+
+# ==========================================
+# HTML RENDERING
+# ==========================================
+
+TABLE_COLUMNS = (
+    ('trades', 'Trades'), ('win_rate', 'Win %'), ('total_pnl', 'P&L'),
+    ('profit_factor', 'PF'), ('expectancy', 'Expectancy'),
+    ('max_drawdown', 'Max DD'), ('avg_mae', 'Avg MAE'), ('avg_mfe', 'Avg MFE')
+)
+
+SECTION_TITLES = {
+    'daily': 'Daily', 'weekly': 'Weekly', 'monthly': 'Monthly',
+    'instrument': 'By Instrument', 'strike': 'By Strike Offset'
+}
+
+# No marks recorded for the trades in this bucket
+EXCURSIONS = ('avg_mae', 'avg_mfe', 'worst_mae', 'best_mfe')
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>CPR Trading Bot Performance Report</title>
+    <style>
+        body { font-family: Arial; background: #1a1a1a; color: #fff; padding: 20px; }
+        .header { text-align: center; margin-bottom: 30px; }
+        .card { background: #2a2a2a; padding: 20px; margin: 10px 0; border-radius: 10px; }
+        .metric { display: inline-block; margin: 10px 20px; }
+        .value { font-size: 28px; font-weight: bold; }
+        .label { font-size: 14px; color: #888; }
+        .positive { color: #4CAF50; }
+        .negative { color: #f44336; }
+        table { width: 100%%; border-collapse: collapse; margin-top: 20px; }
+        th, td { padding: 8px; text-align: right; border-bottom: 1px solid #444; }
+        th:first-child, td:first-child { text-align: left; }
+        th { background: #333; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>📊 CPR Trading Bot - Performance Report</h1>
+        <p>Generated %(generated_at)s | %(events)d trades</p>
+    </div>
+    <div class="card">
+        <h2>Summary</h2>
+        %(summary_html)s
+    </div>
+    %(sections_html)s
+</body>
+</html>
+"""
+
+
+def _fmt(value, key=None):
+    if value is None:
+        return '–' if key in EXCURSIONS else '∞'
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return escape(str(value))
+
+
+def _table(title, rows):
+    head = ''.join(f"<th>{label}</th>" for _, label in TABLE_COLUMNS)
+    body = ''
+    for key, stats in rows:
+        cells = ''.join(f"<td>{_fmt(stats[col], col)}</td>" for col, _ in TABLE_COLUMNS)
+        body += f"<tr><td>{escape(str(key))}</td>{cells}</tr>"
+    return f'<div class="card"><h2>{title}</h2><table><tr><th></th>{head}</tr>{body}</table></div>'
+
+
+def render_html(report):
+    """Render a report dict as static HTML"""
+    summary = report['summary']
+    metrics = (
+        ('total_pnl', 'P&L'), ('return_pct', 'Return %'), ('win_rate', 'Win Rate %'),
+        ('profit_factor', 'Profit Factor'), ('expectancy', 'Expectancy'),
+        ('max_drawdown_pct', 'Max Drawdown %'), ('avg_mae', 'Avg MAE'), ('avg_mfe', 'Avg MFE')
+    )
+    summary_html = ''
+    for key, label in metrics:
+        value = summary[key]
+        css = ''
+        if key in ('total_pnl', 'return_pct', 'expectancy'):
+            css = 'positive' if value >= 0 else 'negative'
+        summary_html += (
+            f'<div class="metric"><div class="value {css}">{_fmt(value, key)}</div>'
+            f'<div class="label">{label}</div></div>'
+        )
+
+    curve_rows = [(p['date'], p) for p in report['equity_curve']]
+    curve_html = '<div class="card"><h2>Equity Curve</h2><table><tr><th>Date</th><th>P&L</th><th>Equity</th><th>Drawdown %</th></tr>'
+    for day, point in curve_rows:
+        curve_html += f"<tr><td>{day}</td><td>{_fmt(point['pnl'])}</td><td>{_fmt(point['equity'])}</td><td>{_fmt(point['drawdown_pct'])}</td></tr>"
+    curve_html += '</table></div>'
+
+    sections = [curve_html]
+    for name in PERIODS + BREAKDOWNS:
+        sections.append(_table(SECTION_TITLES[name], report[name].items()))
+
+    return HTML_TEMPLATE % {
+        'generated_at': escape(report['generated_at']),
+        'events': report['events'],
+        'summary_html': summary_html,
+        'sections_html': '\n    '.join(sections)
+    }
@@ -0,0 +1,22 @@
+"""Clock - Single source of "now", replaceable for market replay"""
+from datetime import datetime
+
+_source = None
+
+
+def now(tz=None):
+    """Current time, or the replay clock's time when one is installed"""
+    if _source is not None:
+        return _source(tz)
+    return datetime.now(tz)
+
+
+def set_clock(source):
+    """Install a callable source(tz) -> datetime"""
+    global _source
+    _source = source
+
+
+def reset_clock():
+    """Back to wall-clock time"""
+    set_clock(None)
@@ -0,0 +1,86 @@
+"""Dashboard - HTML rendering for the live dashboard"""
+
+DASHBOARD_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>CPR Trading Bot Dashboard</title>
+    <meta http-equiv="refresh" content="30">
+    <style>
+        body { font-family: Arial; background: #1a1a1a; color: #fff; padding: 20px; }
+        .header { text-align: center; margin-bottom: 30px; }
+        .card { background: #2a2a2a; padding: 20px; margin: 10px 0; border-radius: 10px; }
+        .metric { display: inline-block; margin: 10px 20px; }
+        .value { font-size: 32px; font-weight: bold; }
+        .label { font-size: 14px; color: #888; }
+        .positive { color: #4CAF50; }
+        .negative { color: #f44336; }
+        table { width: 100%%; border-collapse: collapse; margin-top: 20px; }
+        th, td { padding: 12px; text-align: left; border-bottom: 1px solid #444; }
+        th { background: #333; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>📊 CPR Trading Bot</h1>
+        <p>CPR + Supertrend + RSI Strategy</p>
+    </div>
+    
+    <div class="card">
+        <h2>Today's Performance</h2>
+        <div class="metric">
+            <div class="value %(pnl_class)s">₹%(pnl).2f</div>
+            <div class="label">P&L</div>
+        </div>
+        <div class="metric">
+            <div class="value">%(trades)d</div>
+            <div class="label">Trades</div>
+        </div>
+        <div class="metric">
+            <div class="value %(wr_class)s">%(win_rate).1f%%</div>
+            <div class="label">Win Rate</div>
+        </div>
+        <div class="metric">
+            <div class="value">%(pf).2f</div>
+            <div class="label">Profit Factor</div>
+        </div>
+    </div>
+    
+    <div class="card">
+        <h2>Open Positions: %(open_count)d</h2>
+        %(positions_html)s
+    </div>
+    
+    <p style="text-align: center; color: #888; margin-top: 30px;">
+        Auto-refreshes every 30 seconds | %(mode)s
+    </p>
+</body>
+</html>
+"""
+
+
+def render_dashboard(stats, positions, paper_trading):
+    """Render today's stats and open positions as HTML"""
+    # Build positions table
+    if positions:
+        pos_html = "<table><tr><th>Symbol</th><th>Entry</th><th>SL</th><th>TP</th></tr>"
+        for pos_id, pos in positions.items():
+            pos_html += f"<tr><td>{pos['symbol']}</td><td>₹{pos['entry_price']}</td><td>₹{pos['stop_loss']}</td><td>₹{pos['take_profit']}</td></tr>"
+        pos_html += "</table>"
+    else:
+        pos_html = "<p>No open positions</p>"
+
+    pnl_class = "positive" if stats['total_pnl'] >= 0 else "negative"
+    wr_class = "positive" if stats.get('win_rate', 0) >= 60 else "negative"
+
+    return DASHBOARD_TEMPLATE % {
+        'pnl': stats['total_pnl'],
+        'pnl_class': pnl_class,
+        'trades': stats['total_trades'],
+        'win_rate': stats.get('win_rate', 0),
+        'wr_class': wr_class,
+        'pf': stats.get('profit_factor', 0),
+        'open_count': len(positions),
+        'positions_html': pos_html,
+        'mode': 'PAPER TRADING' if paper_trading else 'LIVE TRADING'
+    }
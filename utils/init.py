@@ -2,5 +2,6 @@
 from .logger import setup_logger
 from .position_manager import PositionManager
 from .risk_manager import RiskManager
+from .analytics import TradeAnalytics
 
-__all__ = ['setup_logger', 'PositionManager', 'RiskManager']
\ No newline at end of file
+__all__ = ['setup_logger', 'PositionManager', 'RiskManager', 'TradeAnalytics']
\ No newline at end of file
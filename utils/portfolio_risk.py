@@ -0,0 +1,262 @@
+"""Portfolio Risk - Running exposure aggregates and cached broker margin"""
+import threading
+import time
+from collections import defaultdict
+import pytz
+from . import clock
+
+IST = pytz.timezone('Asia/Kolkata')
+
+EXTRINSIC_PCT = 0.004  # time value of a weekly option, % of spot
+
+# Reservations younger than this may still be in flight at the broker
+RECONCILE_GRACE = 60.0
+
+
+def estimate_premium(spot, strike, option_type):
+    """Option price per unit: intrinsic value plus a fixed share of spot as time value"""
+    intrinsic = max(0.0, spot - strike) if option_type == 'CE' else max(0.0, strike - spot)
+    return intrinsic + spot * EXTRINSIC_PCT
+
+
+class MarginCache:
+    """Broker funds (and open positions) with a short TTL, refreshed off the request path
+
+    get() never calls the broker: once the value is older than the TTL it
+    starts a background refresh and returns the last known value. When a
+    positions fetch is given, each refresh also passes the symbols the
+    broker reports as flat (netQty 0) to the listeners'
+    on_broker_positions(flat_symbols, as_of).
+    """
+
+    def __init__(self, fetch, ttl=30.0, timer=time.monotonic, positions=None, listeners=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.timer = timer
+        self.positions = positions
+        self.listeners = list(listeners or [])
+        self.value = None
+        self.fetched_at = None
+        self.version = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Last known available margin (None until first fetch)"""
+        if self.fetched_at is None or self.timer() - self.fetched_at >= self.ttl:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self.refresh, name='margin', daemon=True).start()
+        return self.value
+
+    def refresh(self):
+        """Fetch funds now (blocking) - used by warmup and the background thread"""
+        try:
+            started = self.timer()
+            value = self.fetch()
+            if value is not None:
+                self.value = value
+                self.fetched_at = self.timer()
+                self.version += 1
+            rows = self.positions() if self.positions else None
+            if rows is not None:
+                flat = {row['symbol'] for row in rows if row.get('netQty') == 0}
+                for listener in self.listeners:
+                    listener.on_broker_positions(flat, started)
+        finally:
+            self._refreshing = False
+        return self.value
+
+
+class Exposure:
+    """Open position count and risk for one bucket"""
+
+    __slots__ = ('count', 'risk')
+
+    def __init__(self):
+        self.count = 0
+        self.risk = 0.0
+
+    def add(self, risk, sign=1):
+        self.count += sign
+        self.risk += risk * sign
+
+
+class Holding:
+    """One tracked position or reservation"""
+
+    __slots__ = ('key', 'symbol', 'since', 'margin', 'margin_version')
+
+    def __init__(self, key, symbol, since, margin=0.0, margin_version=None):
+        self.key = key  # (underlying, option_type, expiry, risk)
+        self.symbol = symbol
+        self.since = since
+        self.margin = margin
+        self.margin_version = margin_version
+
+
+class PortfolioRisk:
+    """Exposure by underlying, direction and expiry, updated on open/close
+
+    Every pre-trade check is a handful of dict lookups against these
+    aggregates. A trade that passes is reserved immediately, so two
+    webhooks that are both waiting on the broker cannot both use the same
+    headroom. Positions the broker squares off are dropped when its
+    position book is reconciled (see MarginCache), and everything is
+    reset at the start of a new trading day since all orders are INTRADAY.
+    """
+
+    def __init__(self, config, margin_cache=None):
+        self.config = config
+        self.margin = margin_cache
+        self.timer = margin_cache.timer if margin_cache else time.monotonic
+        self._margin_version = None
+        self._lock = threading.Lock()
+        self._reset(clock.now(IST).date())
+        if margin_cache:
+            margin_cache.listeners.append(self)
+
+    # ------------------------------------------
+    # Aggregates
+    # ------------------------------------------
+
+    def _reset(self, day):
+        self.day = day
+        self.total = Exposure()
+        self.by_underlying = defaultdict(Exposure)
+        self.by_direction = defaultdict(Exposure)  # (underlying, CE/PE)
+        self.by_expiry = defaultdict(Exposure)
+        self.tracked = {}  # position_id -> Holding
+        self.reserved_margin = 0.0
+
+    def _rollover(self):
+        """Drop yesterday's exposure, INTRADAY positions do not carry over"""
+        today = clock.now(IST).date()
+        if today != self.day:
+            self._reset(today)
+
+    def _apply(self, key, sign):
+        underlying, option_type, expiry, risk = key
+        self.total.add(risk, sign)
+        self.by_underlying[underlying].add(risk, sign)
+        self.by_direction[(underlying, option_type)].add(risk, sign)
+        self.by_expiry[expiry].add(risk, sign)
+
+    @staticmethod
+    def _key(trade):
+        return (trade['instrument'], trade['option_type'], trade.get('expiry', ''), trade.get('risk', 0.0))
+
+    def _drop(self, position_id):
+        holding = self.tracked.pop(position_id, None)
+        if holding is None:
+            return
+        self._apply(holding.key, -1)
+        # Margin reserved against the current funds snapshot is available again
+        if holding.margin_version == self._margin_version:
+            self.reserved_margin = max(0.0, self.reserved_margin - holding.margin)
+
+    def on_position_opened(self, position):
+        """PositionManager listener - count positions not reserved via check()"""
+        with self._lock:
+            self._rollover()
+            if position['position_id'] not in self.tracked:
+                key = self._key(position)
+                self.tracked[position['position_id']] = Holding(key, position.get('symbol'), self.timer())
+                self._apply(key, 1)
+
+    def on_position_closed(self, position):
+        """PositionManager listener"""
+        self.release(position['position_id'])
+
+    def release(self, position_id):
+        """Drop a position or a reservation whose order failed"""
+        with self._lock:
+            self._drop(position_id)
+
+    def on_broker_positions(self, flat_symbols, as_of):
+        """MarginCache listener - drop positions the broker reports as closed
+
+        Only symbols the broker lists with netQty 0 count as closed; a
+        holding whose symbol is missing from its book (e.g. formatted
+        differently) is kept until closed here or the day rolls over.
+        Reservations made shortly before the positions request may not be
+        filled yet, so only holdings older than RECONCILE_GRACE are dropped.
+        """
+        with self._lock:
+            for position_id, holding in list(self.tracked.items()):
+                if holding.symbol in flat_symbols and holding.since < as_of - RECONCILE_GRACE:
+                    self._drop(position_id)
+
+    # ------------------------------------------
+    # Pre-trade check
+    # ------------------------------------------
+
+    def _available_margin(self):
+        if not self.margin:
+            return None
+        available = self.margin.get()
+        if available is None:
+            return None
+        # Funds snapshot predates orders placed since; discount them
+        if self.margin.version != self._margin_version:
+            self._margin_version = self.margin.version
+            self.reserved_margin = 0.0
+        return available - self.reserved_margin
+
+    def check(self, trade):
+        """Check and reserve a trade, returns (allowed, message)"""
+        config = self.config
+        underlying, option_type, expiry, risk = key = self._key(trade)
+        capital = config.CAPITAL
+
+        with self._lock:
+            self._rollover()
+
+            if trade['position_id'] in self.tracked:
+                return False, f"Duplicate position id {trade['position_id']}"
+
+            if self.total.risk + risk > capital * config.MAX_PORTFOLIO_RISK / 100:
+                return False, f"Portfolio risk limit ({config.MAX_PORTFOLIO_RISK}% of capital)"
+
+            if self.by_underlying[underlying].risk + risk > capital * config.MAX_UNDERLYING_RISK / 100:
+                return False, f"{underlying} risk limit ({config.MAX_UNDERLYING_RISK}% of capital)"
+
+            if self.by_underlying[underlying].count >= config.MAX_POSITIONS_PER_UNDERLYING:
+                return False, f"{underlying} position limit ({config.MAX_POSITIONS_PER_UNDERLYING})"
+
+            if self.by_direction[(underlying, option_type)].count >= config.MAX_SAME_DIRECTION:
+                return False, f"{underlying} {option_type} position limit ({config.MAX_SAME_DIRECTION})"
+
+            # A long option costs its premium; estimated, the fill price is not known yet
+            required = estimate_premium(trade['entry_price'], trade['strike'], option_type) * trade['quantity']
+            available = self._available_margin()
+            if available is not None and required > available:
+                return False, f"Insufficient margin (₹{required:,.2f} needed, ₹{available:,.2f} available)"
+
+            self.tracked[trade['position_id']] = Holding(
+                key, trade.get('symbol'), self.timer(), required, self._margin_version
+            )
+            self._apply(key, 1)
+            self.reserved_margin += required
+            return True, "OK"
+
+    def snapshot(self):
+        """Current exposure for reporting"""
+        def dump(buckets):
+            return {
+                (k if isinstance(k, str) else '_'.join(k)): {"count": v.count, "risk": round(v.risk, 2)}
+                for k, v in buckets.items() if v.count
+            }
+
+        with self._lock:
+            self._rollover()
+            return {
+                "open_positions": self.total.count,
+                "open_risk": round(self.total.risk, 2),
+                "by_underlying": dump(self.by_underlying),
+                "by_direction": dump(self.by_direction),
+                "by_expiry": dump(self.by_expiry),
+                "available_margin": self.margin.value if self.margin else None,
+                "reserved_margin": round(self.reserved_margin, 2) if self.margin else None
+            }
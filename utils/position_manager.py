@@ -1,15 +1,19 @@
 """Position Manager - Tracks positions and P&L"""
-from datetime import datetime
+import logging
 from collections import defaultdict
 import pytz
+from . import clock
 
 IST = pytz.timezone('Asia/Kolkata')
 
+logger = logging.getLogger('CPR_BOT')
+
 class PositionManager:
     """Manage trading positions"""
     
-    def __init__(self):
+    def __init__(self, listeners=None):
         self.positions = {}
+        self.listeners = list(listeners or [])
         self.daily_stats = defaultdict(lambda: {
             'total_trades': 0, 'closed_trades': 0,
             'winners': 0, 'losers': 0,
@@ -22,13 +26,23 @@ class PositionManager:
         """Add new position"""
         self.positions[position_id] = {
             **details,
-            'entry_time': datetime.now(IST).isoformat(),
+            'entry_time': clock.now(IST).isoformat(),
             'status': 'OPEN'
         }
-        today = datetime.now(IST).date().isoformat()
+        today = clock.now(IST).date().isoformat()
         self.daily_stats[today]['total_trades'] += 1
+        self._notify('on_position_opened', self.positions[position_id])
         return position_id
     
+    def mark_price(self, position_id, price):
+        """Track max adverse/favourable excursion of an open position"""
+        pos = self.positions.get(position_id)
+        if not pos or pos['status'] != 'OPEN':
+            return
+        move = self._pnl(pos, price)
+        pos['mae'] = min(pos.get('mae', 0.0), move)
+        pos['mfe'] = max(pos.get('mfe', 0.0), move)
+    
     def close_position(self, position_id, exit_price):
         """Close position and calculate P&L"""
         if position_id not in self.positions:
@@ -40,12 +54,16 @@ class PositionManager:
         
         pos['status'] = 'CLOSED'
         pos['exit_price'] = exit_price
-        pos['exit_time'] = datetime.now(IST).isoformat()
+        pos['exit_time'] = clock.now(IST).isoformat()
         
-        pnl = (exit_price - pos['entry_price']) * pos['quantity']
+        pnl = self._pnl(pos, exit_price)
         pos['pnl'] = pnl
+        # Excursions are only known if prices were marked while open
+        if 'mae' in pos:
+            pos['mae'] = min(pos['mae'], pnl)
+            pos['mfe'] = max(pos['mfe'], pnl)
         
-        today = datetime.now(IST).date().isoformat()
+        today = clock.now(IST).date().isoformat()
         stats = self.daily_stats[today]
         stats['closed_trades'] += 1
         stats['total_pnl'] += pnl
@@ -69,15 +87,40 @@ class PositionManager:
             'pnl': pnl
         })
         
+        self._notify('on_position_closed', pos)
         return pnl
     
+    @staticmethod
+    def _pnl(pos, price):
+        """P&L at price; entries are underlying prices, so PE gains as it falls"""
+        direction = -1 if pos.get('option_type') == 'PE' else 1
+        return (price - pos['entry_price']) * pos['quantity'] * direction
+    
+    def _notify(self, event, position):
+        """Forward position events to listeners (risk, analytics)
+
+        A failing listener is logged and skipped; the position change has
+        already happened and the remaining listeners must still see it.
+        """
+        for listener in self.listeners:
+            handler = getattr(listener, event, None)
+            if handler:
+                try:
+                    handler(position)
+                except Exception as e:
+                    logger.error(f"❌ {type(listener).__name__}.{event} failed: {e}", exc_info=True)
+    
+    def get_position(self, position_id):
+        """Get a single position"""
+        return self.positions.get(position_id)
+    
     def get_open_positions(self):
         """Get all open positions"""
         return {k: v for k, v in self.positions.items() if v['status'] == 'OPEN'}
     
     def get_today_stats(self):
         """Get today's statistics"""
-        today = datetime.now(IST).date().isoformat()
+        today = clock.now(IST).date().isoformat()
         stats = self.daily_stats[today]
         
         if stats['closed_trades'] > 0:
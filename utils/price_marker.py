@@ -0,0 +1,60 @@
+"""Price Marker - Marks open positions from broker quotes for MAE/MFE
+
+Position entries are underlying prices, so open positions are marked with
+the index quote of their instrument. Polling only runs while something is
+open and stops at square-off; it is started by the first position opened,
+so it always runs in the process (worker) that holds the positions.
+"""
+import threading
+from . import clock
+from .warmup import INDEX_SYMBOLS, Warmup
+
+
+class PriceMarker:
+    """PositionManager listener that polls index quotes while positions are open"""
+
+    def __init__(self, config, position_manager, quotes, logger=None):
+        self.config = config
+        self.position_manager = position_manager
+        self.quotes = quotes  # blocking get_quotes(symbols) -> {symbol: ltp}
+        self.logger = logger
+        hour, minute = (int(part) for part in config.SQUARE_OFF_TIME.split(':'))
+        self.square_off = (hour, minute)
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def on_position_opened(self, position):
+        """PositionManager listener - start polling if idle"""
+        with self._lock:
+            if self._timer is None:
+                self._schedule()
+
+    def _schedule(self):
+        self._timer = threading.Timer(self.config.MARK_INTERVAL, self.mark)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _active(self):
+        now = clock.now(self.config.IST)
+        return (now.hour, now.minute) < self.square_off and self.position_manager.get_open_positions()
+
+    def mark(self):
+        """Mark every open position once, then reschedule while any remain"""
+        open_positions = self.position_manager.get_open_positions()
+        if open_positions:
+            try:
+                prices = Warmup.index_prices(self.quotes(list(INDEX_SYMBOLS.values())))
+            except Exception as e:
+                prices = {}
+                if self.logger:
+                    self.logger.warning(f"⚠️ Price marking failed: {e}")
+            for position_id, position in open_positions.items():
+                price = prices.get(position.get('instrument'))
+                if price:
+                    self.position_manager.mark_price(position_id, price)
+
+        with self._lock:
+            if self._active():
+                self._schedule()
+            else:
+                self._timer = None
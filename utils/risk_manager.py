@@ -3,8 +3,9 @@
 class RiskManager:
     """Risk management and limits"""
     
-    def __init__(self, config):
+    def __init__(self, config, portfolio=None):
         self.config = config
+        self.portfolio = portfolio
     
     def can_trade(self, stats):
         """Check if trading allowed"""
@@ -26,6 +27,17 @@ class RiskManager:
         max_risk = (self.config.CAPITAL * self.config.MAX_RISK_PER_TRADE) / 100
         return position_risk <= max_risk
     
+    def check_portfolio_risk(self, trade):
+        """Check (and reserve) exposure across open positions"""
+        if self.portfolio is None:
+            return True, "OK"
+        return self.portfolio.check(trade)
+    
+    def release(self, position_id):
+        """Return reserved exposure for a trade that was not opened"""
+        if self.portfolio is not None:
+            self.portfolio.release(position_id)
+    
     def calculate_position_size(self, risk_per_contract):
         """Calculate position size"""
         max_risk = (self.config.CAPITAL * self.config.MAX_RISK_PER_TRADE) / 100
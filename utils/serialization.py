@@ -0,0 +1,53 @@
+"""JSON Serialization - Fastest available backend with stdlib fallback"""
+import json
+
+try:
+    import orjson
+
+    BACKEND = 'orjson'
+    loads = orjson.loads
+    DecodeError = orjson.JSONDecodeError
+
+    def dumps(obj):
+        """Encode to compact JSON bytes"""
+        return orjson.dumps(obj)
+
+except ImportError:
+    try:
+        import msgspec
+
+        BACKEND = 'msgspec'
+        loads = msgspec.json.decode
+        DecodeError = msgspec.DecodeError
+        dumps = msgspec.json.Encoder().encode
+
+    except ImportError:
+        BACKEND = 'json'
+        loads = json.loads
+        DecodeError = ValueError
+
+        def dumps(obj):
+            """Encode to compact JSON bytes"""
+            return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def splice(raw, **fields):
+    """Append fields to an already-encoded JSON object"""
+    extra = dumps(fields)
+    if len(extra) <= 2:
+        return raw
+    sep = b',' if len(raw) > 2 else b''
+    return raw[:-1] + sep + extra[1:]
+
+
+def dumps_with(obj, **encoded):
+    """Encode obj, embedding already-encoded JSON values under extra keys
+
+    Lets a response reuse bytes that were encoded earlier (e.g. for
+    logging) instead of serializing the same dict twice.
+    """
+    body = dumps(obj)
+    for key, raw in encoded.items():
+        sep = b',' if len(body) > 2 else b''
+        body = body[:-1] + sep + dumps(key) + b':' + raw + b'}'
+    return body
@@ -0,0 +1,109 @@
+"""Signal Decoder - Validates TradingView webhook payloads in one pass"""
+import hmac
+import math
+from .serialization import loads, DecodeError
+
+ACTIONS = {'BUY_CALL': 'CE', 'BUY_PUT': 'PE'}
+
+
+class SignalError(ValueError):
+    """Rejected webhook payload"""
+    status = 400
+
+
+class UnauthorizedSignal(SignalError):
+    """Webhook secret missing or wrong"""
+    status = 401
+
+
+def _upper(value):
+    if not isinstance(value, str):
+        raise TypeError(value)
+    return value.upper()
+
+
+def _number(value):
+    # bool is an int subclass, but `true` is not a price
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(value)
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(value)
+    return value
+
+
+def _positive(value):
+    value = _number(value)
+    if value <= 0:
+        raise ValueError(value)
+    return value
+
+
+def _non_negative(value):
+    value = _number(value)
+    if value < 0:
+        raise ValueError(value)
+    return value
+
+
+# (field, converter, required, default) - converters raise ValueError on bad input
+SCHEMA = (
+    ('instrument', _upper, True, ''),
+    ('action', _upper, True, ''),
+    ('entry_price', _positive, True, 0),
+    ('atr', _positive, True, 0),
+    ('strike', _non_negative, False, 0),
+)
+
+
+class WebhookSignal:
+    """Validated alert from TradingView"""
+
+    __slots__ = ('instrument', 'action', 'option_type', 'entry_price', 'atr', 'strike')
+
+    def __repr__(self):
+        return (
+            f"WebhookSignal({self.instrument} {self.action} "
+            f"entry={self.entry_price} atr={self.atr} strike={self.strike})"
+        )
+
+
+def decode_signal(body, secret):
+    """Parse, authenticate and convert a raw webhook body
+
+    The secret is checked with a constant-time comparison before any
+    field is looked at. Raises SignalError (or UnauthorizedSignal) with
+    the message to return to the caller.
+    """
+    try:
+        data = loads(body)
+    except DecodeError:
+        raise SignalError("Invalid JSON")
+    if not isinstance(data, dict):
+        raise SignalError("Invalid JSON")
+
+    supplied = data.get('secret')
+    if not isinstance(supplied, str) or not hmac.compare_digest(
+            supplied.encode('utf-8'), secret.encode('utf-8')):
+        raise UnauthorizedSignal("Unauthorized")
+
+    signal = WebhookSignal()
+    for field, convert, required, default in SCHEMA:
+        value = data.get(field)
+        if value is None or value == '':
+            if required:
+                raise SignalError("Missing required fields")
+            value = default
+        else:
+            try:
+                value = convert(value)
+            except (TypeError, ValueError):
+                raise SignalError(f"Invalid {field}")
+        setattr(signal, field, value)
+
+    option_type = ACTIONS.get(signal.action)
+    if option_type is None:
+        raise SignalError("Invalid action")
+    signal.option_type = option_type
+
+    return signal
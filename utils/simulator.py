@@ -0,0 +1,429 @@
+"""Market Simulator - Order books, fill models and deterministic replay
+
+Replays recorded ticks and TradingView alerts through the same
+WebhookService the servers use, with a SimulatedBroker standing in for
+Fyers. Time comes from the replay clock (utils.clock), orders fill after
+a sampled latency against the book at that moment, and stop loss, take
+profit and square-off exits are simulated on underlying ticks. Given the
+same inputs and seed the output is byte-for-byte identical.
+"""
+import csv
+import heapq
+import json
+import logging
+import math
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime, timedelta
+import pytz
+from . import clock
+from .analytics import TradeAnalytics
+from .portfolio_risk import PortfolioRisk
+from .position_manager import PositionManager
+from .risk_manager import RiskManager
+from .serialization import dumps
+from .webhook_service import WebhookService, WebhookRejected
+from .warmup import INDEX_SYMBOLS
+
+IST = pytz.timezone('Asia/Kolkata')
+
+TICK_SIZE = 0.05
+DEFAULT_DEPTH = 1800
+IMPLIED_VOL = 0.14  # annualised, for options priced from the underlying
+EXPIRY_TIME = (15, 30)
+YEAR_SECONDS = 365 * 24 * 3600
+
+OPTION_SYMBOL = re.compile(r'(\d{2})([A-Z]{3})(\d{2})(\d+)(CE|PE)$')
+MONTHS = {'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+          'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12}
+UNDERLYINGS = {symbol: name for name, symbol in INDEX_SYMBOLS.items()}
+UNDERLYINGS.update({name: name for name in INDEX_SYMBOLS})
+
+
+def to_tick(price):
+    return round(round(price / TICK_SIZE) * TICK_SIZE, 2)
+
+
+def parse_ts(value):
+    """ISO timestamp, naive values are taken as IST"""
+    ts = datetime.fromisoformat(value)
+    return IST.localize(ts) if ts.tzinfo is None else ts
+
+
+# ==========================================
+# ORDER BOOK AND FILL MODELS
+# ==========================================
+
+class OrderBook:
+    """Top of book for one symbol"""
+
+    __slots__ = ('symbol', 'bid', 'ask', 'bid_qty', 'ask_qty', 'ltp')
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bid = self.ask = self.ltp = 0.0
+        self.bid_qty = self.ask_qty = 0
+
+    def update(self, ltp, bid=None, ask=None, bid_qty=None, ask_qty=None):
+        self.ltp = ltp
+        self.bid = bid if bid else to_tick(ltp - TICK_SIZE)
+        self.ask = ask if ask else to_tick(ltp + TICK_SIZE)
+        self.bid_qty = bid_qty or DEFAULT_DEPTH
+        self.ask_qty = ask_qty or DEFAULT_DEPTH
+
+
+def _norm_cdf(x):
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def black_scholes(spot, strike, years, option_type, vol=IMPLIED_VOL):
+    """European option price with zero rates"""
+    intrinsic = max(0.0, spot - strike) if option_type == 'CE' else max(0.0, strike - spot)
+    if years <= 0 or vol <= 0:
+        return intrinsic
+    sd = vol * math.sqrt(years)
+    d1 = (math.log(spot / strike) + sd * sd / 2) / sd
+    call = spot * _norm_cdf(d1) - strike * _norm_cdf(d1 - sd)
+    return call if option_type == 'CE' else call - spot + strike  # put-call parity
+
+
+def synthetic_book(symbol, spot, now):
+    """Option book priced from the underlying when no ticks were recorded"""
+    match = OPTION_SYMBOL.search(symbol)
+    if not match or not spot:
+        return None
+    day, month, year, strike, option_type = match.groups()
+    expiry = IST.localize(datetime(2000 + int(year), MONTHS[month], int(day), *EXPIRY_TIME))
+    years = max(0.0, (expiry - now).total_seconds()) / YEAR_SECONDS
+    book = OrderBook(symbol)
+    book.update(max(TICK_SIZE, to_tick(black_scholes(spot, int(strike), years, option_type))))
+    return book
+
+
+class LatencyModel:
+    """Order acknowledgement-to-fill delay"""
+
+    def __init__(self, base_ms=50.0, jitter_ms=20.0, rng=None):
+        self.base_ms = base_ms
+        self.jitter_ms = jitter_ms
+        self.rng = rng or random.Random(0)
+
+    def sample(self):
+        """Delay as a timedelta"""
+        jitter = self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return timedelta(milliseconds=self.base_ms + jitter)
+
+
+class SlippageModel:
+    """Market orders cross the spread, plus slippage that grows past book depth"""
+
+    def __init__(self, bps=5.0):
+        self.bps = bps
+
+    def fill_price(self, book, side, quantity):
+        price, depth = (book.ask, book.ask_qty) if side > 0 else (book.bid, book.bid_qty)
+        overflow = max(0, quantity - depth) / max(depth, 1)
+        slip = price * self.bps / 10000 * (1 + overflow)
+        return max(TICK_SIZE, to_tick(price + slip if side > 0 else price - slip))
+
+
+# ==========================================
+# BROKER
+# ==========================================
+
+class SimulatedBroker:
+    """Drop-in for FyersClient that fills against simulated books"""
+
+    def __init__(self, market, latency, slippage):
+        self.market = market
+        self.latency = latency
+        self.slippage = slippage
+        self.pending = []
+        self.order_count = 0
+
+    def connect(self):
+        return True
+
+    def place_order(self, symbol, quantity, side, order_type="MARKET"):
+        """Queue a market order, fills after the sampled latency"""
+        self.order_count += 1
+        order_id = f"SIM{self.order_count:06d}"
+        fill_at = clock.now(IST) + self.latency.sample()
+        heapq.heappush(self.pending, (fill_at, self.order_count, {
+            "order_id": order_id, "symbol": symbol, "quantity": quantity, "side": side
+        }))
+        return {"success": True, "order_id": order_id}
+
+    def fill(self, order):
+        """Execute an order against the current book"""
+        book = self.market.book_for(order['symbol'])
+        return self.slippage.fill_price(book, order['side'], order['quantity'])
+
+    def get_quotes(self, symbols):
+        return {s: self.market.books[s].ltp for s in symbols if s in self.market.books}
+
+    def get_positions(self):
+        return []
+
+
+# ==========================================
+# REPLAY ENGINE
+# ==========================================
+
+def load_ticks(path):
+    """CSV with ts,symbol,ltp[,bid,ask,bid_qty,ask_qty]"""
+    ticks = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            ticks.append((
+                parse_ts(row['ts']), row['symbol'], float(row['ltp']),
+                float(row['bid']) if row.get('bid') else None,
+                float(row['ask']) if row.get('ask') else None,
+                int(row['bid_qty']) if row.get('bid_qty') else None,
+                int(row['ask_qty']) if row.get('ask_qty') else None
+            ))
+    return ticks
+
+
+def load_alerts(path):
+    """JSONL with {"ts": ..., "payload": {...webhook body...}}"""
+    alerts = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                alert = json.loads(line)
+                alerts.append((parse_ts(alert['ts']), alert['payload']))
+    return alerts
+
+
+def synthetic_session(day, seed=0, instrument='NIFTY', spot=21500.0, alert_every=45):
+    """One trading day of 1s underlying ticks and periodic alerts"""
+    rng = random.Random(seed)
+    start = IST.localize(datetime.combine(day, datetime.min.time()).replace(hour=9, minute=15))
+    ticks, alerts, window = [], [], deque(maxlen=300)
+    for second in range(6 * 3600 + 15 * 60):
+        ts = start + timedelta(seconds=second)
+        spot = to_tick(spot * (1 + rng.gauss(0, 0.00012)))
+        ticks.append((ts, INDEX_SYMBOLS[instrument], spot, None, None, None, None))
+        window.append(spot)
+        if second and second % (alert_every * 60) == 0:
+            trend = window[-1] - window[0]
+            alerts.append((ts, {
+                "instrument": instrument,
+                "action": "BUY_CALL" if trend >= 0 else "BUY_PUT",
+                "entry_price": spot,
+                "atr": round((max(window) - min(window)) / 2, 2) or 10.0
+            }))
+    return ticks, alerts
+
+
+class MarketReplay:
+    """Drive the trading stack from recorded ticks and alerts"""
+
+    def __init__(self, config, ticks, alerts, seed=0, latency_ms=50.0,
+                 jitter_ms=20.0, slippage_bps=5.0, speed=0.0):
+        self.config = config
+        self.ticks = ticks
+        self.alerts = alerts
+        self.speed = speed
+        self.now = None
+        self.books = {}
+        self.output = []
+        self.exits = {}  # position_id -> exit reason, while the exit order is pending
+        self.orders = {}  # order_id -> (position_id, 'entry' | 'exit')
+        self.pending_spot = None  # alert price, until the underlying has ticked
+
+        logger = logging.getLogger('CPR_REPLAY')
+        logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+
+        self.analytics = TradeAnalytics(config.CAPITAL)
+        self.portfolio_risk = PortfolioRisk(config)
+        self.position_manager = PositionManager(listeners=[self.portfolio_risk, self.analytics])
+        self.service = WebhookService(
+            config, self.position_manager, RiskManager(config, self.portfolio_risk),
+            logger, self.analytics
+        )
+        self.broker = SimulatedBroker(
+            self, LatencyModel(latency_ms, jitter_ms, random.Random(seed)), SlippageModel(slippage_bps)
+        )
+        hour, minute = (int(part) for part in config.SQUARE_OFF_TIME.split(':'))
+        self.square_off = (hour, minute)
+
+    # ------------------------------------------
+    # Market state
+    # ------------------------------------------
+
+    def book_for(self, symbol):
+        """Recorded book, or one derived from the underlying"""
+        book = self.books.get(symbol)
+        if book is not None:
+            return book
+        spot = self.spot(self.instrument_of(symbol)) or self.pending_spot
+        return synthetic_book(symbol, spot, self.now)
+
+    @staticmethod
+    def instrument_of(symbol):
+        name = symbol.split(':', 1)[-1]
+        for instrument in sorted(INDEX_SYMBOLS, key=len, reverse=True):
+            if name.startswith(instrument):
+                return instrument
+        return ''
+
+    def spot(self, instrument):
+        for symbol in (INDEX_SYMBOLS.get(instrument), instrument):
+            if symbol in self.books:
+                return self.books[symbol].ltp
+        return None
+
+    # ------------------------------------------
+    # Event handlers
+    # ------------------------------------------
+
+    def emit(self, kind, **fields):
+        self.output.append({"ts": self.now.isoformat(), "type": kind, **fields})
+
+    def on_tick(self, symbol, ltp, bid, ask, bid_qty, ask_qty):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+        book.update(ltp, bid, ask, bid_qty, ask_qty)
+
+        instrument = UNDERLYINGS.get(symbol)
+        if instrument is None:
+            return
+        past_square_off = (self.now.hour, self.now.minute) >= self.square_off
+        for position_id, pos in self.position_manager.get_open_positions().items():
+            if pos['instrument'] != instrument or position_id in self.exits:
+                continue
+            self.position_manager.mark_price(position_id, ltp)
+            if 'fill_price' not in pos:
+                continue  # nothing to exit until the entry has filled
+            reason = self.exit_reason(pos, ltp, past_square_off)
+            if reason:
+                self.exit(position_id, pos, reason)
+
+    @staticmethod
+    def exit_reason(pos, price, past_square_off):
+        if pos['option_type'] == 'CE':
+            if price <= pos['stop_loss']:
+                return 'STOP_LOSS'
+            if price >= pos['take_profit']:
+                return 'TAKE_PROFIT'
+        else:
+            if price >= pos['stop_loss']:
+                return 'STOP_LOSS'
+            if price <= pos['take_profit']:
+                return 'TAKE_PROFIT'
+        return 'SQUARE_OFF' if past_square_off else None
+
+    def exit(self, position_id, pos, reason):
+        self.exits[position_id] = reason
+        result = self.broker.place_order(pos['symbol'], pos['quantity'], side=-1)
+        self.orders[result['order_id']] = (position_id, 'exit')
+
+    def on_alert(self, payload):
+        # The position would be squared off on the next tick
+        if (self.now.hour, self.now.minute) >= self.square_off:
+            self.emit("alert", status=429, message="Past square-off time")
+            return
+        self.pending_spot = payload.get('entry_price')
+        body = dumps({**payload, "secret": self.config.WEBHOOK_SECRET})
+        try:
+            trade, trade_json = self.service.prepare(body)
+        except WebhookRejected as e:
+            self.emit("alert", status=e.status, message=e.payload['message'])
+            return
+
+        order_result = self.broker.place_order(trade['symbol'], trade['quantity'], side=1)
+        self.service.record_order(trade, trade_json, order_result)
+        self.orders[order_result['order_id']] = (trade['position_id'], 'entry')
+        self.emit("alert", status=200, position_id=trade['position_id'],
+                  symbol=trade['symbol'], order_id=order_result['order_id'])
+
+    def on_fill(self, order):
+        position_id, leg = self.orders.pop(order['order_id'])
+        price = self.broker.fill(order)
+        pos = self.position_manager.get_position(position_id)
+        self.emit("fill", order_id=order['order_id'], position_id=position_id, leg=leg,
+                  symbol=order['symbol'], side=order['side'], quantity=order['quantity'],
+                  price=price)
+
+        if leg == 'entry':
+            pos['fill_price'] = price
+            return
+
+        underlying = self.spot(pos['instrument'])
+        pnl = self.position_manager.close_position(position_id, underlying)
+        reason = self.exits.pop(position_id)
+        entry = pos.get('fill_price')
+        if entry is None:
+            # Without an entry fill there is no premium P&L; flag it, don't book 0
+            self.emit("exit", position_id=position_id, reason=reason, underlying=underlying,
+                      pnl=round(pnl, 2), premium_pnl=None, error="exit filled before entry")
+            return
+        self.emit("exit", position_id=position_id, reason=reason, underlying=underlying,
+                  pnl=round(pnl, 2), premium_pnl=round((price - entry) * pos['quantity'], 2))
+
+    # ------------------------------------------
+    # Main loop
+    # ------------------------------------------
+
+    def _fill_due(self, until):
+        pending = self.broker.pending
+        while pending and (until is None or pending[0][0] <= until):
+            fill_at, _, order = heapq.heappop(pending)
+            self.now = max(self.now, fill_at)
+            self.on_fill(order)
+
+    def _pace(self, first_ts, wall_start):
+        if self.speed <= 0:
+            return
+        target = wall_start + (self.now - first_ts).total_seconds() / self.speed
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def run(self):
+        """Replay everything, returns the summary"""
+        events = [(tick[0], 0, i, tick[1:]) for i, tick in enumerate(self.ticks)]
+        events += [(ts, 1, i, payload) for i, (ts, payload) in enumerate(self.alerts)]
+        events.sort(key=lambda e: e[:3])
+        if not events:
+            return self.summary()
+
+        first_ts = events[0][0]
+        self.now = first_ts
+        wall_start = time.perf_counter()
+        clock.set_clock(lambda tz=None: self.now.astimezone(tz) if tz else self.now)
+        try:
+            for ts, kind, _, item in events:
+                self._fill_due(ts)
+                self.now = ts
+                self._pace(first_ts, wall_start)
+                if kind == 0:
+                    self.on_tick(*item)
+                else:
+                    self.on_alert(item)
+            self._fill_due(None)
+            return self.summary()
+        finally:
+            clock.reset_clock()
+
+    def summary(self):
+        report = self.analytics.build_report()
+        report.pop('generated_at')
+        counts = {}
+        for event in self.output:
+            counts[event['type']] = counts.get(event['type'], 0) + 1
+        return {
+            "ticks": len(self.ticks),
+            "alerts": len(self.alerts),
+            "events": counts,
+            "premium_pnl": round(sum(
+                e['premium_pnl'] for e in self.output if e['type'] == 'exit' and e['premium_pnl'] is not None
+            ), 2),
+            "report": report
+        }
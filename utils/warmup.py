@@ -0,0 +1,217 @@
+"""Warmup - Startup pipeline, readiness and pre-market re-warm
+
+Under gunicorn (see gunicorn.conf.py) the app is imported once in the
+master, which runs the CPU-only steps (imports, lookup tables) and then
+freezes the heap so forked workers share it copy-on-write. Each worker
+then opens its own broker connection in the background and reports ready
+once that is done, retrying with backoff if the broker is unreachable.
+A daily timer repeats the warmup before market open and re-reads the
+access token, so the one rotated that morning is picked up.
+"""
+import asyncio
+import importlib
+import inspect
+import threading
+import time
+from datetime import datetime, timedelta
+from .serialization import dumps
+from .signal_decoder import decode_signal, SignalError
+from .webhook_service import STRIKE_INTERVALS
+
+# Captured at import, i.e. in the gunicorn master before any fork
+PROCESS_START = time.time()
+
+INDEX_SYMBOLS = {
+    'NIFTY': 'NSE:NIFTY50-INDEX',
+    'BANKNIFTY': 'NSE:NIFTYBANK-INDEX',
+    'FINNIFTY': 'NSE:FINNIFTY-INDEX',
+    'SENSEX': 'BSE:SENSEX-INDEX'
+}
+
+# Imported during warmup instead of lazily on the first order
+PRELOAD_IMPORTS = ('fyers_apiv3.fyersModel',)
+
+# Seconds to wait before retrying a failed warmup, the last one repeats
+RETRY_DELAYS = (5, 15, 30, 60, 120, 300)
+
+
+def blocking(call):
+    """Broker method callable from a plain thread; async clients get their own loop"""
+    if inspect.iscoroutinefunction(call):
+        return lambda *args: asyncio.run(call(*args))
+    return call
+
+
+class Warmup:
+    """Run startup steps and track readiness"""
+
+    def __init__(self, config, service, broker=None, logger=None, margin_cache=None):
+        self.config = config
+        self.service = service
+        self.broker = broker
+        self.logger = logger
+        self.margin_cache = margin_cache
+        self.ready = threading.Event()
+        self.timings = {}
+        self.last_run = None
+        self.first_order_seconds = None
+        self.failures = 0
+        self._timer = None
+        self._retry_timer = None
+        self._running = threading.Lock()
+
+    # ------------------------------------------
+    # Steps
+    # ------------------------------------------
+
+    def preload_imports(self):
+        """Import modules that are only needed on the order path"""
+        for name in PRELOAD_IMPORTS:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+
+        # First calls pay for backend setup, do it off the hot path
+        try:
+            decode_signal(b'{"secret":""}', self.config.WEBHOOK_SECRET or 'x')
+        except SignalError:
+            pass
+        dumps({"warmup": True})
+
+    def warm_tables(self, prices=None):
+        """Expiry, lot size and strike -> symbol tables"""
+        expiry = None
+        for instrument in STRIKE_INTERVALS:
+            expiry = self.service.get_expiry_date(instrument)
+            self.service.get_lot_size(instrument)
+
+        band = self.config.WARMUP_STRIKES
+        for instrument, price in (prices or {}).items():
+            interval = STRIKE_INTERVALS[instrument]
+            atm = round(price / interval) * interval
+            for step in range(-band, band + 1):
+                strike = atm + step * interval
+                for option_type in ('CE', 'PE'):
+                    self.service.construct_symbol(instrument, strike, option_type, expiry)
+
+    def connect_broker(self):
+        """Open the broker session and fetch index prices"""
+        if not self.broker:
+            return {}
+        self.config.reload_access_token()
+        if not blocking(self.broker.connect)():
+            raise RuntimeError("broker connection failed")
+        quotes = blocking(self.broker.get_quotes)(list(INDEX_SYMBOLS.values()))
+        return self.index_prices(quotes)
+
+    @staticmethod
+    def index_prices(quotes):
+        """Map index quotes back to instrument names"""
+        return {
+            instrument: quotes[symbol]
+            for instrument, symbol in INDEX_SYMBOLS.items() if symbol in quotes
+        }
+
+    # ------------------------------------------
+    # Pipelines
+    # ------------------------------------------
+
+    def _timed(self, name, step, *args):
+        start = time.perf_counter()
+        result = step(*args)
+        self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    def run(self, connect=True):
+        """Run warmup; readiness is only reported once the broker is up
+
+        A process that is already ready stays ready while a re-warm runs
+        or fails, since orders reconnect lazily anyway. Failures are
+        retried on a timer with backoff.
+        """
+        if not self._running.acquire(blocking=False):
+            return False  # daily re-warm and a retry overlapped
+        try:
+            self._timed('imports', self.preload_imports)
+            self._timed('tables', self.warm_tables)
+
+            if connect:
+                try:
+                    prices = self._timed('broker', self.connect_broker)
+                    self._timed('strikes', self.warm_tables, prices)
+                    if self.margin_cache:
+                        self._timed('margin', self.margin_cache.refresh)
+                except Exception as e:
+                    if self.logger:
+                        self.logger.error(f"❌ Warmup failed: {e}")
+                    self.schedule_retry()
+                    return False
+                self.failures = 0
+                self.mark_ready()
+            return True
+        finally:
+            self._running.release()
+
+    def mark_ready(self):
+        """Flag the process as ready to take orders"""
+        self.last_run = datetime.now(self.config.IST).isoformat()
+        self.ready.set()
+        if self.logger:
+            self.logger.info(
+                f"🔥 Warmup done in {time.time() - PROCESS_START:.2f}s since start | {self.timings}"
+            )
+
+    def schedule_retry(self):
+        """Run warmup again after the next backoff delay"""
+        delay = RETRY_DELAYS[min(self.failures, len(RETRY_DELAYS) - 1)]
+        self.failures += 1
+        if self.logger:
+            self.logger.warning(f"🔁 Warmup retry {self.failures} in {delay}s")
+        self._retry_timer = threading.Timer(delay, self.run)
+        self._retry_timer.daemon = True
+        self._retry_timer.start()
+
+    def start_background(self):
+        """Connect in a thread so the worker can serve /ready meanwhile"""
+        threading.Thread(target=self.run, name='warmup', daemon=True).start()
+        self.schedule_daily()
+
+    def schedule_daily(self):
+        """Re-run warmup every trading day at WARMUP_TIME (IST)"""
+        hour, minute = (int(part) for part in self.config.WARMUP_TIME.split(':'))
+        now = datetime.now(self.config.IST)
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+
+        def rewarm():
+            if datetime.now(self.config.IST).weekday() < 5:
+                self.run()
+            self.schedule_daily()
+
+        self._timer = threading.Timer((target - now).total_seconds(), rewarm)
+        self._timer.daemon = True
+        self._timer.start()
+
+    # ------------------------------------------
+    # Reporting
+    # ------------------------------------------
+
+    def on_position_opened(self, position):
+        """PositionManager listener - time to first good order"""
+        if self.first_order_seconds is None:
+            self.first_order_seconds = round(time.time() - PROCESS_START, 3)
+            if self.logger:
+                self.logger.info(f"⏱️ Time to first order: {self.first_order_seconds}s since start")
+
+    def status(self):
+        """Readiness probe payload"""
+        return {
+            "status": "ready" if self.ready.is_set() else "warming_up",
+            "uptime": round(time.time() - PROCESS_START, 3),
+            "last_warmup": self.last_run,
+            "timings_ms": self.timings,
+            "failed_attempts": self.failures,
+            "time_to_first_order": self.first_order_seconds
+        }
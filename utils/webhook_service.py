@@ -0,0 +1,381 @@
+"""Webhook Service - Server-agnostic request handling
+
+Shared by the Flask app (app.py) and the ASGI app (asgi.py). Everything
+except talking to the broker lives here, so both servers behave the same
+and only differ in whether the order call is awaited. build_components()
+wires the whole stack for either server.
+"""
+import itertools
+from datetime import timedelta
+from functools import lru_cache
+from types import SimpleNamespace
+from . import clock
+from .analytics import TradeAnalytics
+from .dashboard import render_dashboard
+from .portfolio_risk import PortfolioRisk, MarginCache
+from .position_manager import PositionManager
+from .risk_manager import RiskManager
+from .serialization import dumps, dumps_with, splice
+from .signal_decoder import decode_signal, SignalError, UnauthorizedSignal
+
+MONTHS = {
+    '01': 'JAN', '02': 'FEB', '03': 'MAR', '04': 'APR',
+    '05': 'MAY', '06': 'JUN', '07': 'JUL', '08': 'AUG',
+    '09': 'SEP', '10': 'OCT', '11': 'NOV', '12': 'DEC'
+}
+
+STRIKE_INTERVALS = {
+    'NIFTY': 50,
+    'BANKNIFTY': 100,
+    'FINNIFTY': 50,
+    'SENSEX': 100
+}
+
+
+@lru_cache(maxsize=4096)
+def format_symbol(instrument, strike, option_type, expiry):
+    """Construct Fyers symbol format (cached, warmed at startup)"""
+    year = expiry[:2]
+    month = MONTHS[expiry[2:4]]
+    day = expiry[4:6]
+
+    # Clean instrument name
+    clean_inst = instrument.replace("NSE:", "").upper()
+    if "NIFTY" in clean_inst and "BANK" not in clean_inst and "FIN" not in clean_inst:
+        clean_inst = "NIFTY"
+
+    return f"NSE:{clean_inst}{day}{month}{year}{int(strike)}{option_type}"
+
+
+class WebhookRejected(Exception):
+    """Request ends early with a JSON error response"""
+
+    def __init__(self, status, payload):
+        super().__init__(payload.get('message'))
+        self.status = status
+        self.payload = payload
+
+
+class WebhookService:
+    """Trade construction and read-only endpoints"""
+
+    def __init__(self, config, position_manager, risk_manager, logger, analytics=None):
+        self.config = config
+        self.position_manager = position_manager
+        self.risk_manager = risk_manager
+        self.logger = logger
+        self.analytics = analytics
+        self.lot_sizes = {
+            'NIFTY': config.LOT_SIZE_NIFTY,
+            'BANKNIFTY': config.LOT_SIZE_BANKNIFTY,
+            'FINNIFTY': config.LOT_SIZE_FINNIFTY,
+            'SENSEX': config.LOT_SIZE_SENSEX
+        }
+        self._expiry = (None, None)  # (date, expiry) - recomputed once per day
+        self._sequence = itertools.count(1)  # keeps same-second position ids apart
+
+    # ------------------------------------------
+    # Trade construction
+    # ------------------------------------------
+
+    def get_expiry_date(self, instrument):
+        """Calculate next weekly expiry (Thursday)"""
+        now = clock.now(self.config.IST)
+        today = now.date()
+        if self._expiry[0] == today:
+            return self._expiry[1]
+
+        days_ahead = 3 - now.weekday()  # Thursday = 3
+        if days_ahead <= 0:
+            days_ahead += 7
+        expiry = (now + timedelta(days=days_ahead)).strftime('%y%m%d')
+        self._expiry = (today, expiry)
+        return expiry
+
+    def construct_symbol(self, instrument, strike, option_type, expiry):
+        """Construct Fyers symbol format"""
+        return format_symbol(instrument, strike, option_type, expiry)
+
+    def calculate_strike(self, entry_price, instrument, option_type):
+        """Calculate ATM/ITM/OTM strike based on config"""
+        interval = STRIKE_INTERVALS.get(instrument, 50)
+        atm_strike = round(entry_price / interval) * interval
+
+        # Adjust based on selection
+        strike_map = {
+            'ATM': 0,
+            'ITM1': -1 if option_type == 'CE' else 1,
+            'ITM2': -2 if option_type == 'CE' else 2,
+            'OTM1': 1 if option_type == 'CE' else -1,
+            'OTM2': 2 if option_type == 'CE' else -2
+        }
+
+        offset = strike_map.get(self.config.STRIKE_SELECTION, 0)
+        return int(atm_strike + (offset * interval))
+
+    def get_lot_size(self, instrument):
+        """Get lot size for instrument"""
+        return self.lot_sizes.get(instrument.upper(), 50)
+
+    def prepare(self, body):
+        """Validate a webhook body and build the trade
+
+        Returns (trade_details, trade_json). Raises WebhookRejected when
+        the request must not reach the broker.
+        """
+        config = self.config
+
+        # Authenticate and validate in one pass
+        try:
+            signal = decode_signal(body, config.WEBHOOK_SECRET)
+        except SignalError as e:
+            if isinstance(e, UnauthorizedSignal):
+                self.logger.warning("⚠️ Unauthorized webhook attempt")
+            raise WebhookRejected(e.status, {"status": "error", "message": str(e)})
+
+        self.logger.info(f"📥 Webhook received: {signal}")
+
+        # Check daily limits
+        can_trade, message = self.risk_manager.can_trade(self.position_manager.get_today_stats())
+        if not can_trade:
+            self.logger.warning(f"⚠️ Trade blocked: {message}")
+            raise WebhookRejected(429, {"status": "blocked", "message": message})
+
+        instrument = signal.instrument
+        option_type = signal.option_type
+        entry_price = signal.entry_price
+        atr = signal.atr
+
+        # Calculate strike
+        if signal.strike == 0:
+            strike = self.calculate_strike(entry_price, instrument, option_type)
+            strike_selection = config.STRIKE_SELECTION
+        else:
+            strike = signal.strike
+            strike_selection = "MANUAL"
+        interval = STRIKE_INTERVALS.get(instrument, 50)
+        strike_offset = int(round((strike - round(entry_price / interval) * interval) / interval))
+
+        # Get details
+        expiry = self.get_expiry_date(instrument)
+        symbol = self.construct_symbol(instrument, strike, option_type, expiry)
+        quantity = self.get_lot_size(instrument)
+
+        # Calculate SL and TP
+        if option_type == "CE":
+            stop_loss = entry_price - (atr * config.SL_MULTIPLIER)
+            take_profit = entry_price + (atr * config.TP_MULTIPLIER)
+        else:  # PE
+            stop_loss = entry_price + (atr * config.SL_MULTIPLIER)
+            take_profit = entry_price - (atr * config.TP_MULTIPLIER)
+
+        # Risk calculation
+        position_risk = atr * config.SL_MULTIPLIER * quantity
+
+        # Check risk limits
+        if not self.risk_manager.check_position_risk(position_risk):
+            raise WebhookRejected(429, {
+                "status": "blocked",
+                "message": f"Position risk ₹{position_risk:.2f} exceeds limit"
+            })
+
+        # Create position ID
+        timestamp = clock.now(config.IST).strftime('%H%M%S')
+        position_id = f"CPR_{instrument}_{strike}{option_type}_{timestamp}_{next(self._sequence)}"
+
+        trade_details = {
+            "position_id": position_id,
+            "strategy": "CPR",
+            "instrument": instrument,
+            "symbol": symbol,
+            "action": signal.action,
+            "option_type": option_type,
+            "strike": strike,
+            "strike_selection": strike_selection,
+            "strike_offset": strike_offset,
+            "entry_price": entry_price,
+            "quantity": quantity,
+            "stop_loss": round(stop_loss, 2),
+            "take_profit": round(take_profit, 2),
+            "atr": atr,
+            "expiry": expiry,
+            "risk": round(position_risk, 2)
+        }
+
+        # Portfolio limits last: a pass reserves exposure until the order resolves
+        allowed, message = self.risk_manager.check_portfolio_risk(trade_details)
+        if not allowed:
+            self.logger.warning(f"⚠️ Trade blocked: {message}")
+            raise WebhookRejected(429, {"status": "blocked", "message": message})
+
+        # Encoded once, reused for the log line and the response body
+        trade_json = dumps(trade_details)
+        self.logger.info(f"📊 Trade Details: {trade_json.decode('utf-8')}")
+
+        return trade_details, trade_json
+
+    def record_paper(self, trade_details, trade_json):
+        """Book a paper trade, returns the encoded response"""
+        self.position_manager.add_position(trade_details['position_id'], trade_details)
+        self.logger.info("📝 PAPER TRADING - No actual order placed")
+
+        return dumps_with({
+            "status": "success",
+            "mode": "paper_trading"
+        }, trade=trade_json)
+
+    def record_order(self, trade_details, trade_json, order_result):
+        """Book a live order result, returns (status, encoded response)"""
+        if not order_result['success']:
+            self.risk_manager.release(trade_details['position_id'])
+            self.logger.error(f"❌ Order failed: {order_result['error']}")
+            return 500, dumps({"status": "error", "message": order_result['error']})
+
+        order_id = order_result['order_id']
+        trade_details['order_id'] = order_id
+        self.position_manager.add_position(trade_details['position_id'], trade_details)
+
+        self.logger.info(f"✅ Order placed: {order_id}")
+
+        return 200, dumps_with({
+            "status": "success",
+            "mode": "live_trading",
+            "order_id": order_id
+        }, trade=splice(trade_json, order_id=order_id))
+
+    # ------------------------------------------
+    # Read endpoints
+    # ------------------------------------------
+
+    def health(self):
+        """Health check payload"""
+        stats = self.position_manager.get_today_stats()
+
+        return {
+            "status": "active",
+            "service": "CPR Trading Bot",
+            "strategy": "CPR + Supertrend + RSI",
+            "version": "1.0.0",
+            "broker": "FYERS",
+            "paper_trading": self.config.PAPER_TRADING,
+            "timestamp": clock.now(self.config.IST).isoformat(),
+            "today_stats": {
+                "trades": stats['total_trades'],
+                "pnl": stats['total_pnl'],
+                "win_rate": stats.get('win_rate', 0)
+            }
+        }
+
+    def positions(self):
+        """All open positions"""
+        positions = self.position_manager.get_open_positions()
+        return {
+            "status": "success",
+            "count": len(positions),
+            "positions": positions
+        }
+
+    def stats(self):
+        """Today's statistics"""
+        return {
+            "status": "success",
+            "stats": self.position_manager.get_today_stats()
+        }
+
+    def trades(self):
+        """Trade log"""
+        trades = self.position_manager.get_trade_log()
+        return {
+            "status": "success",
+            "count": len(trades),
+            "trades": trades
+        }
+
+    def exposure(self):
+        """Open exposure by underlying, direction and expiry"""
+        portfolio = self.risk_manager.portfolio
+        return {
+            "status": "success",
+            "exposure": portfolio.snapshot() if portfolio else {}
+        }
+
+    def report(self):
+        """Performance report over the full trade history"""
+        return {
+            "status": "success",
+            "report": self.analytics.build_report()
+        }
+
+    def close(self, position_id):
+        """Manually close a position, returns (status, payload)"""
+        position = self.position_manager.get_position(position_id)
+
+        if not position:
+            return 404, {"status": "error", "message": "Position not found"}
+
+        if position['status'] == 'CLOSED':
+            return 400, {"status": "error", "message": "Position already closed"}
+
+        # Get current price (mock for paper trading)
+        move = 0.95 if position.get('option_type') == 'PE' else 1.05
+        exit_price = position['entry_price'] * move  # Mock 5% profit
+
+        pnl = self.position_manager.close_position(position_id, exit_price)
+
+        self.logger.info(f"💰 Position closed manually: {position_id} | P&L: ₹{pnl:.2f}")
+
+        return 200, {
+            "status": "success",
+            "message": "Position closed",
+            "pnl": pnl
+        }
+
+    def dashboard(self):
+        """Dashboard HTML"""
+        return render_dashboard(
+            self.position_manager.get_today_stats(),
+            self.position_manager.get_open_positions(),
+            self.config.PAPER_TRADING
+        )
+
+
+def build_components(config, broker, logger):
+    """Wire the trading stack used by both servers
+
+    broker is a FyersClient, an AsyncFyersClient or None for paper
+    trading. Returns a namespace with fyers_client, margin_cache,
+    portfolio_risk, analytics, position_manager, risk_manager, service,
+    warmup and price_marker.
+    """
+    # These import this module
+    from .price_marker import PriceMarker
+    from .warmup import Warmup, blocking
+
+    # Refreshed from a background thread, async clients run their own loop there
+    margin_cache = MarginCache(
+        blocking(broker.get_funds), config.MARGIN_CACHE_TTL, positions=blocking(broker.get_positions)
+    ) if broker else None
+    portfolio_risk = PortfolioRisk(config, margin_cache)
+    analytics = TradeAnalytics(config.CAPITAL, event_log=config.ANALYTICS_LOG)
+    # Risk first: exposure must be released even if the analytics write fails
+    position_manager = PositionManager(listeners=[portfolio_risk, analytics])
+    risk_manager = RiskManager(config, portfolio_risk)
+    service = WebhookService(config, position_manager, risk_manager, logger, analytics)
+    warmup = Warmup(config, service, broker, logger, margin_cache)
+    position_manager.listeners.append(warmup)
+    # MAE/MFE need marks while open; without a broker there is no price feed
+    price_marker = PriceMarker(config, position_manager, blocking(broker.get_quotes), logger) if broker else None
+    if price_marker:
+        position_manager.listeners.append(price_marker)
+
+    return SimpleNamespace(
+        fyers_client=broker,
+        margin_cache=margin_cache,
+        portfolio_risk=portfolio_risk,
+        analytics=analytics,
+        position_manager=position_manager,
+        risk_manager=risk_manager,
+        service=service,
+        warmup=warmup,
+        price_marker=price_marker
+    )